@@ -1,144 +1,234 @@
 """Chat API endpoints with streaming support"""
 
-import json
-import time
 import asyncio
-from typing import AsyncGenerator
-from fastapi import APIRouter, HTTPException, Depends
+import time
+from datetime import datetime
+from typing import AsyncGenerator, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 
 from app.models.chat import (
+    AnswerStatus,
+    BatchChatRequest,
+    BatchChatResult,
+    ChatMessage,
     ChatRequest,
     ChatResponse,
     StreamChunk,
     SourceReference,
     MessageRole,
 )
+from app.api.streaming import ClientDisconnected, SSEEncoder, until_disconnected
+from app.core.admission import OverloadedError
+from app.core.background import spawn
+from app.core.metrics import registry
+from app.core.timing import current_timings, record
 from app.rag import get_rag_service
+from app.rag.law_mapper import LawCodeMapper
 from app.services.redis_service import get_redis_service, RedisService
 from app.core.config import settings
 
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+sse_encoder = SSEEncoder(
+    flush_interval=settings.sse_flush_interval_ms / 1000,
+    flush_bytes=settings.sse_flush_bytes,
+)
+
+ANSWERS = registry.counter(
+    "chat_stream_answers_total", "Streamed answers by how they ended", ["status"]
+)
+
+
+def build_sources(result: dict, include_sources: bool = True) -> List[SourceReference]:
+    """Build source references for the top 3 sources of a RAG result"""
+    sources = []
+    if include_sources and result.get("sources"):
+        for source in result["sources"][:3]:  # Top 3 sources
+            sources.append(
+                SourceReference(
+                    law_code=source.get("law_code", ""),
+                    law_name_az=source.get("law_name", ""),
+                    law_name_en=source.get("law_code", ""),
+                    article_reference=source.get("article_ref"),
+                    relevance_score=source.get("relevance_score", 0),
+                    content_preview=source.get("content", "")[:500],
+                )
+            )
+    return sources
+
+
+def build_turn(
+    question: str,
+    answer: str,
+    sources: List[SourceReference],
+    start_time: float,
+    status: Optional[AnswerStatus] = None,
+) -> List[ChatMessage]:
+    """The user and assistant messages of one chat turn"""
+    metadata = {
+        "sources": [s.model_dump() for s in sources],
+        "processing_time": time.time() - start_time,
+    }
+    if status is not None:
+        metadata["status"] = status.value
+
+    return [
+        ChatMessage(
+            role=MessageRole.USER,
+            content=question,
+            timestamp=datetime.utcfromtimestamp(start_time),
+            metadata={},
+        ),
+        ChatMessage(role=MessageRole.ASSISTANT, content=answer, metadata=metadata),
+    ]
+
+
+async def save_turn(
+    redis_service: RedisService,
+    session_id: str,
+    question: str,
+    answer: str,
+    sources: List[SourceReference],
+    start_time: float,
+    status: AnswerStatus,
+) -> None:
+    """Record a streamed turn, including cancelled and partial answers"""
+    ANSWERS.inc(status=status.value)
+    await redis_service.add_messages(
+        session_id, build_turn(question, answer, sources, start_time, status)
+    )
+
+
+async def close_answer_stream(*streams: AsyncGenerator) -> None:
+    """Close answer streams so upstream generation stops"""
+    for stream in streams:
+        try:
+            await stream.aclose()
+        except RuntimeError:
+            # Still running in a task that is being cancelled
+            pass
+
 
 async def stream_response(
     question: str,
     session_id: str,
-    rag_service,
+    result: dict,
     redis_service: RedisService,
     include_sources: bool = True,
+    start_time: Optional[float] = None,
 ) -> AsyncGenerator[str, None]:
-    """Generate streaming response for chat"""
-    try:
-        start_time = time.time()
-
-        # Save user message to history
-        await redis_service.add_message(
-            session_id=session_id, role=MessageRole.USER, content=question
-        )
-
-        # Get chat history for context
-        messages = await redis_service.get_session_messages(
-            session_id=session_id, limit=10
-        )
-
-        # Perform RAG search with streaming
-        result = rag_service.query_stream(question, k=settings.retrieval_k)
+    """Generate streaming response for chat
+
+    If the client disconnects, the answer stream is closed, which cancels
+    retrieval sharing and the upstream LLM stream, and whatever was sent so
+    far is recorded with a cancelled status. The turn is written to Redis in
+    the background once the stream ends, so it never delays the answer.
+    """
+    start_time = start_time or time.time()
+    timings = current_timings()
+    answer_stream = result.get("answer_stream")
+    deltas = sse_encoder.coalesce(answer_stream) if answer_stream else None
+    full_answer = ""
+    sources: List[SourceReference] = []
+    status = AnswerStatus.COMPLETED
 
+    try:
         # Prepare sources
-        sources = []
-        if include_sources and result.get("sources"):
-            for source in result["sources"][:3]:  # Top 3 sources
-                sources.append(
-                    SourceReference(
-                        law_code=source.get("law_code", ""),
-                        law_name_az=source.get("law_name", ""),
-                        law_name_en=source.get("law_code", ""),
-                        article_reference=source.get("article_ref"),
-                        relevance_score=source.get("relevance_score", 0),
-                        content_preview=source.get("content", "")[:500],
-                    )
-                )
+        sources = build_sources(result, include_sources)
 
         # Stream the answer
-        full_answer = ""
-        if "answer_stream" in result:
-            # Stream the LLM response in real-time
-            for text_chunk in result["answer_stream"]:
-                if text_chunk:
-                    full_answer += text_chunk
-                    chunk = StreamChunk(type="content", content=text_chunk, done=False)
-                    yield f"data: {chunk.model_dump_json()}\n\n"
-                    # Small delay for streaming effect
-                    await asyncio.sleep(0.01)
+        if deltas is not None:
+            # Stream the LLM response in real-time, coalescing small deltas
+            async for text_chunk in deltas:
+                if not full_answer and timings is not None:
+                    record("ttft", timings.elapsed())
+                full_answer += text_chunk
+                yield sse_encoder.content(text_chunk)
         else:
             # Fallback to non-streaming
-            answer = result.get("answer", "")
-            sentences = answer.split(". ")
-
-            for i, sentence in enumerate(sentences):
-                if sentence.strip():
-                    # Add period back if not the last sentence
-                    if i < len(sentences) - 1:
-                        sentence += "."
-
-                    full_answer += sentence + " "
-                    chunk = StreamChunk(
-                        type="content", content=sentence + " ", done=False
-                    )
-                    yield f"data: {chunk.model_dump_json()}\n\n"
-                    await asyncio.sleep(0.05)
+            full_answer = result.get("answer", "")
+            if full_answer:
+                yield sse_encoder.content(full_answer)
 
         # Send sources if requested
         if sources:
             sources_chunk = StreamChunk(type="sources", sources=sources, done=False)
-            yield f"data: {sources_chunk.model_dump_json()}\n\n"
-
-        # Save assistant message to history
-        await redis_service.add_message(
-            session_id=session_id,
-            role=MessageRole.ASSISTANT,
-            content=full_answer,
-            metadata={
-                "sources": [s.model_dump() for s in sources],
-                "processing_time": time.time() - start_time,
-            },
-        )
+            yield sse_encoder.chunk(sources_chunk)
+
+        # Send per-stage timings, including those after the headers went out
+        if timings is not None:
+            stats_chunk = StreamChunk(type="stats", stats=timings.as_dict())
+            yield sse_encoder.chunk(stats_chunk)
 
         # Send completion signal
-        done_chunk = StreamChunk(type="done", done=True)
-        yield f"data: {done_chunk.model_dump_json()}\n\n"
+        yield sse_encoder.chunk(StreamChunk(type="done", done=True))
+
+    except (asyncio.CancelledError, GeneratorExit):
+        # The client disconnected
+        status = AnswerStatus.CANCELLED
+        raise
 
     except Exception as e:
-        error_chunk = StreamChunk(type="error", error=str(e), done=True)
-        yield f"data: {error_chunk.model_dump_json()}\n\n"
+        status = AnswerStatus.ERROR
+        yield sse_encoder.chunk(StreamChunk(type="error", error=str(e), done=True))
+
+    finally:
+        # Awaiting here may be cancelled again, so the cleanup runs as tasks
+        if deltas is not None:
+            spawn(close_answer_stream(deltas, answer_stream))
+        spawn(
+            save_turn(
+                redis_service,
+                session_id,
+                question,
+                full_answer,
+                sources,
+                start_time,
+                status,
+            )
+        )
 
 
 @router.post("/stream")
 async def chat_stream(
-    request: ChatRequest, redis_service: RedisService = Depends(get_redis_service)
+    request: ChatRequest,
+    http_request: Request,
+    redis_service: RedisService = Depends(get_redis_service),
 ):
     """Stream chat responses using Server-Sent Events"""
     try:
+        start_time = time.time()
+
         # Get RAG service
         rag_service = get_rag_service()
 
-        # Extend session TTL
-        await redis_service.extend_session_ttl(request.session_id)
+        # Retrieve before the response starts so overload can still be a 429,
+        # and stop retrieving if the client leaves in the meantime
+        result = await until_disconnected(
+            http_request,
+            rag_service.aquery_stream(request.message, k=settings.retrieval_k),
+        )
 
         # Create streaming response
         return EventSourceResponse(
             stream_response(
                 question=request.message,
                 session_id=request.session_id,
-                rag_service=rag_service,
+                result=result,
                 redis_service=redis_service,
                 include_sources=request.include_sources,
+                start_time=start_time,
             )
         )
 
+    except ClientDisconnected:
+        ANSWERS.inc(status=AnswerStatus.CANCELLED.value)
+        return Response(status_code=499)
+    except OverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -154,46 +244,18 @@ async def chat(
         # Get RAG service
         rag_service = get_rag_service()
 
-        # Save user message
-        await redis_service.add_message(
-            session_id=request.session_id,
-            role=MessageRole.USER,
-            content=request.message,
-        )
-
-        # Extend session TTL
-        await redis_service.extend_session_ttl(request.session_id)
-
         # Query RAG
-        result = rag_service.query(request.message, k=settings.retrieval_k)
+        result = await rag_service.aquery(request.message, k=settings.retrieval_k)
 
         # Prepare sources
-        sources = []
-        if request.include_sources and result.get("sources"):
-            for source in result["sources"][:3]:
-                sources.append(
-                    SourceReference(
-                        law_code=source.get("law_code", ""),
-                        law_name_az=source.get("law_name", ""),
-                        law_name_en=source.get("law_code", ""),
-                        article_reference=source.get("article_ref"),
-                        relevance_score=source.get("relevance_score", 0),
-                        content_preview=source.get("content", "")[:500],
-                    )
-                )
+        sources = build_sources(result, request.include_sources)
 
         answer = result.get("answer", "")
         processing_time = time.time() - start_time
 
-        # Save assistant message
-        await redis_service.add_message(
-            session_id=request.session_id,
-            role=MessageRole.ASSISTANT,
-            content=answer,
-            metadata={
-                "sources": [s.model_dump() for s in sources],
-                "processing_time": processing_time,
-            },
+        # Save the question and answer in one round trip
+        await redis_service.add_messages(
+            request.session_id, build_turn(request.message, answer, sources, start_time)
         )
 
         return ChatResponse(
@@ -203,6 +265,69 @@ async def chat(
             processing_time=processing_time,
         )
 
+    except OverloadedError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def batch_response(
+    questions: List[str],
+    prepared: list,
+    rag_service,
+    include_sources: bool = True,
+) -> AsyncGenerator[str, None]:
+    """Generate NDJSON lines for a prepared batch of questions as they complete"""
+    async for index, result in rag_service.aanswer_batch(
+        questions,
+        prepared,
+        concurrency=settings.batch_llm_concurrency,
+    ):
+        line = BatchChatResult(
+            index=index,
+            question=questions[index],
+            answer=result.get("answer", ""),
+            sources=build_sources(result, include_sources),
+            cached=result.get("cached", False),
+            error=result.get("error"),
+        )
+        yield line.model_dump_json() + "\n"
+
+
+@router.post("/batch")
+async def chat_batch(request: BatchChatRequest, http_request: Request):
+    """Answer a batch of questions, streaming NDJSON results as they complete"""
+    if len(request.questions) > settings.batch_max_questions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.batch_max_questions} questions per batch",
+        )
+
+    try:
+        # Get RAG service
+        rag_service = get_rag_service()
+
+        # Embed and retrieve before the response starts so overload can
+        # still be a 429, and stop if the client leaves in the meantime
+        prepared = await until_disconnected(
+            http_request,
+            rag_service.aprepare_batch(request.questions, k=settings.retrieval_k),
+        )
+
+        return StreamingResponse(
+            batch_response(
+                questions=request.questions,
+                prepared=prepared,
+                rag_service=rag_service,
+                include_sources=request.include_sources,
+            ),
+            media_type="application/x-ndjson",
+        )
+
+    except ClientDisconnected:
+        return Response(status_code=499)
+    except OverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -216,13 +341,15 @@ async def get_chat_history(
     """Get chat history for a session"""
     try:
         messages = await redis_service.get_session_messages(
-            session_id=session_id, limit=limit
+            session_id=session_id, limit=limit, include_sources=True
         )
+        summary = await redis_service.get_session_summary(session_id)
 
         return {
             "session_id": session_id,
             "messages": [msg.model_dump() for msg in messages],
             "count": len(messages),
+            "summary": summary,
         }
 
     except Exception as e:
@@ -246,3 +373,19 @@ async def delete_session(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/cache/{law_code}")
+async def invalidate_law_code_cache(law_code: str):
+    """Invalidate cached answers that cite a law code in every worker"""
+    if law_code not in LawCodeMapper.known_codes():
+        raise HTTPException(status_code=404, detail=f"Unknown law code: {law_code}")
+
+    try:
+        rag_service = get_rag_service()
+        invalidated = await rag_service.invalidate_law_code(law_code)
+
+        return {"law_code": law_code, "invalidated": invalidated}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,60 @@
+"""Retrieval-only search endpoints"""
+
+import time
+from fastapi import APIRouter, HTTPException
+
+from app.core.admission import OverloadedError
+from app.models.search import SearchRequest, SearchResponse, SearchResult
+from app.rag import get_rag_service
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.post("/", response_model=SearchResponse)
+async def search(request: SearchRequest):
+    """Return ranked legal chunks for a query without generating an answer"""
+    try:
+        start_time = time.time()
+
+        # Get RAG service
+        rag_service = get_rag_service()
+
+        # Retrieve one page of results
+        documents = await rag_service.asearch(
+            request.query,
+            k=request.k,
+            offset=request.offset,
+            law_code=request.law_code,
+            chunk_type=request.chunk_type,
+        )
+
+        results = [
+            SearchResult(
+                content=doc.page_content,
+                law_code=doc.metadata.get("law_code", ""),
+                law_name_az=doc.metadata.get("law_name_az", ""),
+                law_name_en=doc.metadata.get("law_name_en", ""),
+                chunk_type=doc.metadata.get("chunk_type"),
+                chapter=doc.metadata.get("chapter"),
+                section=doc.metadata.get("section"),
+                article_number=doc.metadata.get("article_number"),
+                article_reference=doc.metadata.get("article_reference"),
+                chunk_id=doc.metadata.get("chunk_id"),
+                relevance_score=doc.metadata.get("relevance_score", 0),
+            )
+            for doc in documents
+        ]
+
+        return SearchResponse(
+            query=request.query,
+            results=results,
+            k=request.k,
+            offset=request.offset,
+            count=len(results),
+            processing_time=time.time() - start_time,
+        )
+
+    except OverloadedError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
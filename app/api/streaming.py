@@ -0,0 +1,129 @@
+"""Server-Sent Events encoding with content delta coalescing"""
+
+import asyncio
+import json
+from typing import AsyncGenerator, AsyncIterator, Awaitable, List, TypeVar
+
+from starlette.requests import Request
+
+from app.models.chat import StreamChunk
+
+T = TypeVar("T")
+
+_CONTENT_PLACEHOLDER = "__content__"
+
+
+class SSEEncoder:
+    """Encode stream chunks as SSE frames and coalesce LLM deltas"""
+
+    def __init__(self, flush_interval: float = 0.02, flush_bytes: int = 64):
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+
+        # Pre-serialize the content frame so each delta costs one json.dumps
+        template = StreamChunk(
+            type="content", content=_CONTENT_PLACEHOLDER, done=False
+        ).model_dump_json()
+        prefix, suffix = template.split(json.dumps(_CONTENT_PLACEHOLDER))
+        self._content_prefix = f"data: {prefix}"
+        self._content_suffix = f"{suffix}\n\n"
+
+    def content(self, text: str) -> str:
+        """Encode a content frame"""
+        return (
+            f"{self._content_prefix}"
+            f"{json.dumps(text, ensure_ascii=False)}"
+            f"{self._content_suffix}"
+        )
+
+    @staticmethod
+    def chunk(chunk: StreamChunk) -> str:
+        """Encode an arbitrary stream chunk"""
+        return f"data: {chunk.model_dump_json()}\n\n"
+
+    async def coalesce(self, deltas: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+        """Join deltas and flush them on a byte or time budget
+
+        The first delta is flushed immediately so time-to-first-token is not
+        delayed. Afterwards deltas are buffered until ``flush_bytes`` is
+        reached or ``flush_interval`` has elapsed since the first buffered
+        delta, whichever comes first.
+        """
+        loop = asyncio.get_running_loop()
+        iterator = deltas.__aiter__()
+        buffer: List[str] = []
+        size = 0
+        deadline = None
+        first = True
+        pending = None
+
+        try:
+            while True:
+                if pending is None and deadline is None:
+                    # Nothing buffered, so there is no timer to honour
+                    try:
+                        delta = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                else:
+                    if pending is None:
+                        pending = asyncio.ensure_future(iterator.__anext__())
+                    timeout = (
+                        None if deadline is None else max(deadline - loop.time(), 0)
+                    )
+                    done, _ = await asyncio.wait({pending}, timeout=timeout)
+                    if not done:
+                        # Time budget spent while the model is still thinking
+                        yield "".join(buffer)
+                        buffer, size, deadline = [], 0, None
+                        continue
+
+                    task, pending = pending, None
+                    try:
+                        delta = task.result()
+                    except StopAsyncIteration:
+                        break
+
+                if not delta:
+                    continue
+
+                buffer.append(delta)
+                size += len(delta.encode("utf-8"))
+
+                if (
+                    first
+                    or size >= self.flush_bytes
+                    or (deadline is not None and loop.time() >= deadline)
+                ):
+                    yield "".join(buffer)
+                    buffer, size, deadline = [], 0, None
+                    first = False
+                elif deadline is None:
+                    deadline = loop.time() + self.flush_interval
+
+            if buffer:
+                yield "".join(buffer)
+
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client went away before the response started"""
+
+
+async def until_disconnected(
+    request: Request, awaitable: Awaitable[T], poll_interval: float = 0.1
+) -> T:
+    """Await ``awaitable``, cancelling it if the client disconnects first"""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        task.cancel()
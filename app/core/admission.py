@@ -0,0 +1,230 @@
+"""Per-stage admission control and load shedding"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+QUEUE_DEPTH = registry.gauge(
+    "admission_queue_depth", "Requests waiting for a pipeline stage slot", ["stage"]
+)
+IN_FLIGHT = registry.gauge(
+    "admission_in_flight", "Requests holding a pipeline stage slot", ["stage"]
+)
+REJECTIONS = registry.counter(
+    "admission_rejections_total",
+    "Requests rejected by admission control",
+    ["stage", "reason"],
+)
+
+
+class OverloadedError(Exception):
+    """Raised when a pipeline stage cannot admit a request in time"""
+
+    def __init__(self, stage: str, retry_after: int):
+        super().__init__(f"Stage '{stage}' is overloaded")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """Bound the concurrency and queue depth of one pipeline stage
+
+    A request is rejected immediately when the queue is full or when the
+    expected wait, estimated from the recent service time of the stage,
+    would take it past its deadline. Otherwise it waits for a slot until
+    the deadline.
+    """
+
+    def __init__(self, stage: str, max_concurrency: int, max_queue: int):
+        self.stage = stage
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.waiting = 0
+        self.in_flight = 0
+        self.service_time: Optional[float] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _expected_wait(self) -> float:
+        """Estimate how long a new request would queue for a slot"""
+        if self.in_flight < self.max_concurrency or self.service_time is None:
+            return 0.0
+        return (self.waiting + 1) / self.max_concurrency * self.service_time
+
+    def _reject(self, reason: str, expected_wait: float) -> OverloadedError:
+        REJECTIONS.inc(stage=self.stage, reason=reason)
+        return OverloadedError(self.stage, max(1, math.ceil(expected_wait)))
+
+    def check(self, deadline: Optional[float] = None) -> None:
+        """Raise OverloadedError if a request would be rejected right now"""
+        if self.in_flight < self.max_concurrency:
+            return
+
+        expected_wait = self._expected_wait()
+        if self.waiting >= self.max_queue:
+            raise self._reject("queue_full", expected_wait)
+        if deadline is not None and time.monotonic() + expected_wait > deadline:
+            raise self._reject("deadline", expected_wait)
+
+    async def acquire(self, deadline: Optional[float] = None) -> None:
+        """Wait for a slot, rejecting fast if the deadline cannot be met"""
+        self.check(deadline)
+
+        if not self._semaphore.locked():
+            # A slot is free, so this never suspends
+            await self._semaphore.acquire()
+        else:
+            self.waiting += 1
+            QUEUE_DEPTH.set(self.waiting, stage=self.stage)
+            try:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                await asyncio.wait_for(self._semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                raise self._reject("timeout", self._expected_wait())
+            finally:
+                self.waiting -= 1
+                QUEUE_DEPTH.set(self.waiting, stage=self.stage)
+
+        self.in_flight += 1
+        IN_FLIGHT.set(self.in_flight, stage=self.stage)
+
+    def release(self, elapsed: float) -> None:
+        """Free a slot and fold its service time into the estimate"""
+        self.in_flight -= 1
+        IN_FLIGHT.set(self.in_flight, stage=self.stage)
+        self._semaphore.release()
+
+        if self.service_time is None:
+            self.service_time = elapsed
+        else:
+            self.service_time = 0.8 * self.service_time + 0.2 * elapsed
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold a stage slot for the duration of the block"""
+        await self.acquire(deadline)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+
+class AdmissionController:
+    """Admission control for the embed, retrieve and generate stages"""
+
+    def __init__(self):
+        self.enabled = settings.admission_enabled
+        self.deadline_seconds = settings.admission_deadline_seconds
+        self.stages: Dict[str, StageLimiter] = {
+            "embed": StageLimiter(
+                "embed",
+                settings.admission_embed_concurrency,
+                settings.admission_embed_queue,
+            ),
+            "retrieve": StageLimiter(
+                "retrieve",
+                settings.admission_retrieve_concurrency,
+                settings.admission_retrieve_queue,
+            ),
+            "generate": StageLimiter(
+                "generate",
+                settings.admission_generate_concurrency,
+                settings.admission_generate_queue,
+            ),
+        }
+
+    def deadline(self) -> float:
+        """Admission deadline for a request starting now"""
+        return time.monotonic() + self.deadline_seconds
+
+    def check(self, stage: str, deadline: Optional[float] = None) -> None:
+        """Reject early if a stage is already overloaded"""
+        if self.enabled:
+            self.stages[stage].check(deadline)
+
+    async def hold(
+        self, stage: str, deadline: Optional[float] = None
+    ) -> Callable[[], None]:
+        """Acquire a slot now and return the function that frees it
+
+        For work that outlives the call admitting it, such as a streamed
+        answer. The returned function may be called more than once.
+        """
+        if not self.enabled:
+            return lambda: None
+
+        limiter = self.stages[stage]
+        await limiter.acquire(deadline)
+        started = time.monotonic()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                limiter.release(time.monotonic() - started)
+
+        return release
+
+    @asynccontextmanager
+    async def slot(
+        self, stage: str, deadline: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """Hold a slot of a stage for the duration of the block"""
+        if not self.enabled:
+            yield
+            return
+
+        async with self.stages[stage].slot(deadline):
+            yield
+
+
+class AdmittedStream:
+    """Answer stream that frees its held stage slot when it ends
+
+    The slot is freed when the stream is exhausted, fails, is closed or is
+    dropped. An async generator that never started would skip its
+    ``finally`` on close, which leaks the slot if the response body never
+    starts.
+    """
+
+    def __init__(self, stream: AsyncIterator[str], release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    def __aiter__(self) -> "AdmittedStream":
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            return await self._stream.__anext__()
+        except BaseException:
+            self._release()
+            raise
+
+    async def aclose(self) -> None:
+        """Close the underlying stream, so the LLM stream is closed too"""
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+    def __del__(self):
+        self._release()
+
+
+# Create a singleton instance
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create the admission controller"""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
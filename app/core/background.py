@@ -0,0 +1,30 @@
+"""Fire-and-forget background tasks"""
+
+import asyncio
+from typing import Coroutine, Set
+
+_tasks: Set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine) -> asyncio.Task:
+    """Run a coroutine in the background, keeping it referenced until done
+
+    The task is independent of the caller, so cleanup code of a cancelled
+    request can still start awaitable work such as a Redis write.
+    """
+    task = asyncio.get_running_loop().create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_finished)
+    return task
+
+
+def _finished(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"⚠️ Background task failed: {task.exception()}")
+
+
+async def drain(timeout: float = 5.0) -> None:
+    """Wait for pending background tasks, e.g. before shutting down"""
+    if _tasks:
+        await asyncio.wait(set(_tasks), timeout=timeout)
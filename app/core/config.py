@@ -1,7 +1,7 @@
 """Configuration settings for the Azerbaijan Legal RAG API"""
 
 import os
-from typing import Optional
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -26,6 +26,7 @@ class Settings(BaseSettings):
 
     # OpenAI Settings
     openai_api_key: str = Field(..., env="OPENAI_API_KEY")
+    openai_base_url: Optional[str] = Field(default=None, env="OPENAI_BASE_URL")
     llm_model: str = Field(default="gpt-4-turbo", env="LLM_MODEL")
     llm_temperature: float = Field(default=0.1, env="LLM_TEMPERATURE")
 
@@ -42,14 +43,105 @@ class Settings(BaseSettings):
     redis_password: Optional[str] = Field(default=None, env="REDIS_PASSWORD")
     redis_db: int = Field(default=0, env="REDIS_DB")
     session_ttl: int = Field(default=3600, env="SESSION_TTL")  # 1 hour
+    # Messages kept per session; 0 keeps them all
+    session_history_limit: int = Field(default=50, env="SESSION_HISTORY_LIMIT")
+    # Fold messages beyond the limit into a summary instead of dropping them
+    session_history_compaction: bool = Field(
+        default=True, env="SESSION_HISTORY_COMPACTION"
+    )
+    # Encoding of stored messages and sources: "msgpack" or "json"
+    session_serializer: str = Field(default="msgpack", env="SESSION_SERIALIZER")
+    # Compress msgpack records at least this large; 0 disables compression
+    session_compress_min_bytes: int = Field(
+        default=1024, env="SESSION_COMPRESS_MIN_BYTES"
+    )
 
     # RAG Settings
     embedding_model: str = Field(
         default="intfloat/multilingual-e5-large", env="EMBEDDING_MODEL"
     )
     retrieval_k: int = Field(default=5, env="RETRIEVAL_K")
+    embedding_server_socket: Optional[str] = Field(
+        default=None, env="EMBEDDING_SERVER_SOCKET"
+    )
+    # Inference backend: "torch", "onnx" or "onnx-int8"
+    embedding_backend: str = Field(default="torch", env="EMBEDDING_BACKEND")
+    # Threads per model call and between independent operators; 0 = runtime default
+    embedding_intra_op_threads: int = Field(default=0, env="EMBEDDING_INTRA_OP_THREADS")
+    embedding_inter_op_threads: int = Field(default=0, env="EMBEDDING_INTER_OP_THREADS")
+    # Instruction set targeted by int8 quantization: arm64, avx2, avx512, avx512_vnni
+    embedding_quantization: str = Field(default="avx2", env="EMBEDDING_QUANTIZATION")
+    # Where ONNX exports of the embedding model are kept
+    embedding_model_dir: str = Field(default=".models", env="EMBEDDING_MODEL_DIR")
+    # Ingestion worker processes, each with its own model; 0 or 1 embeds in-process
+    embedding_workers: int = Field(default=0, env="EMBEDDING_WORKERS")
+    # Intra-op threads per worker; 0 divides the cores evenly between workers
+    embedding_worker_threads: int = Field(default=0, env="EMBEDDING_WORKER_THREADS")
+    embedding_batch_max_size: int = Field(default=16, env="EMBEDDING_BATCH_MAX_SIZE")
+    embedding_batch_max_wait_ms: float = Field(
+        default=5, env="EMBEDDING_BATCH_MAX_WAIT_MS"
+    )
+    # Precision of cached query embeddings: "float32" or "float16"
+    embedding_cache_dtype: Literal["float32", "float16"] = Field(
+        default="float32", env="EMBEDDING_CACHE_DTYPE"
+    )
+    # In-process tier in front of the Redis embedding cache; 0 entries disables it
+    embedding_cache_memory_entries: int = Field(
+        default=2048, env="EMBEDDING_CACHE_MEMORY_ENTRIES"
+    )
+    embedding_cache_memory_ttl: int = Field(
+        default=3600, env="EMBEDDING_CACHE_MEMORY_TTL"
+    )
     chunk_size: int = Field(default=800, env="CHUNK_SIZE")
     chunk_overlap: int = Field(default=100, env="CHUNK_OVERLAP")
+    # Directory of stored document embeddings reused across ingestion runs
+    document_embedding_store: Optional[str] = Field(
+        default=".embeddings", env="DOCUMENT_EMBEDDING_STORE"
+    )
+
+    # Admission Control Settings
+    admission_enabled: bool = Field(default=True, env="ADMISSION_ENABLED")
+    admission_deadline_seconds: float = Field(
+        default=10.0, env="ADMISSION_DEADLINE_SECONDS"
+    )
+    admission_embed_concurrency: int = Field(
+        default=32, env="ADMISSION_EMBED_CONCURRENCY"
+    )
+    admission_embed_queue: int = Field(default=256, env="ADMISSION_EMBED_QUEUE")
+    admission_retrieve_concurrency: int = Field(
+        default=32, env="ADMISSION_RETRIEVE_CONCURRENCY"
+    )
+    admission_retrieve_queue: int = Field(default=256, env="ADMISSION_RETRIEVE_QUEUE")
+    admission_generate_concurrency: int = Field(
+        default=64, env="ADMISSION_GENERATE_CONCURRENCY"
+    )
+    admission_generate_queue: int = Field(default=128, env="ADMISSION_GENERATE_QUEUE")
+
+    # Batch Settings
+    batch_max_questions: int = Field(default=256, env="BATCH_MAX_QUESTIONS")
+    batch_llm_concurrency: int = Field(default=8, env="BATCH_LLM_CONCURRENCY")
+
+    # Answer Cache Settings
+    answer_cache_enabled: bool = Field(default=True, env="ANSWER_CACHE_ENABLED")
+    answer_cache_ttl: int = Field(default=86400, env="ANSWER_CACHE_TTL")  # 24 hours
+    answer_cache_max_entries: int = Field(default=10000, env="ANSWER_CACHE_MAX_ENTRIES")
+
+    # Semantic Cache Settings
+    semantic_cache_enabled: bool = Field(default=True, env="SEMANTIC_CACHE_ENABLED")
+    semantic_cache_threshold: float = Field(
+        default=0.97, env="SEMANTIC_CACHE_THRESHOLD"
+    )
+    semantic_cache_max_entries: int = Field(
+        default=1000, env="SEMANTIC_CACHE_MAX_ENTRIES"
+    )
+    semantic_cache_ttl: int = Field(default=3600, env="SEMANTIC_CACHE_TTL")
+
+    # Streaming Settings
+    coalesce_inflight_queries: bool = Field(
+        default=True, env="COALESCE_INFLIGHT_QUERIES"
+    )
+    sse_flush_interval_ms: int = Field(default=20, env="SSE_FLUSH_INTERVAL_MS")
+    sse_flush_bytes: int = Field(default=64, env="SSE_FLUSH_BYTES")
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,148 @@
+"""Prometheus metrics, aggregated across worker processes
+
+Metrics are ``prometheus_client`` metrics behind a small registry that takes
+label values as keyword arguments. When ``PROMETHEUS_MULTIPROC_DIR`` is set,
+every worker writes its samples to that directory and ``render`` sums them,
+so a scrape sees the whole server rather than one random worker. The
+directory must be emptied before the server starts.
+"""
+
+import os
+from typing import Dict, Sequence
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter as _Counter,
+    Gauge as _Gauge,
+    Histogram as _Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+
+class _Metric:
+    """Base class for labelled metrics"""
+
+    def __init__(self, metric, labelnames: Sequence[str]):
+        self._metric = metric
+        self.labelnames = tuple(labelnames)
+
+    def _child(self, labels: Dict[str, str]):
+        """The series for a set of label values"""
+        if not self.labelnames:
+            return self._metric
+        return self._metric.labels(
+            *[str(labels.get(name, "")) for name in self.labelnames]
+        )
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase the counter"""
+        self._child(labels).inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, summed over live workers"""
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge"""
+        self._child(labels).set(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase the gauge"""
+        self._child(labels).inc(amount)
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        """Decrease the gauge"""
+        self._child(labels).dec(amount)
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets"""
+
+    def observe(self, value: float, **labels) -> None:
+        """Record an observation"""
+        self._child(labels).observe(value)
+
+
+class MetricsRegistry:
+    """Registry of named metrics"""
+
+    def __init__(self):
+        self._registry = CollectorRegistry()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get_or_create(self, cls, factory, name: str, labelnames, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = cls(
+                factory(name, labelnames=labelnames, registry=self._registry, **kwargs),
+                labelnames,
+            )
+            self._metrics[name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Get or create a counter"""
+        return self._get_or_create(
+            Counter, _Counter, name, labelnames, documentation=documentation
+        )
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        """Get or create a gauge"""
+        return self._get_or_create(
+            Gauge,
+            _Gauge,
+            name,
+            labelnames,
+            documentation=documentation,
+            multiprocess_mode="livesum",
+        )
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram"""
+        return self._get_or_create(
+            Histogram,
+            _Histogram,
+            name,
+            labelnames,
+            documentation=documentation,
+            buckets=buckets,
+        )
+
+    def render(self) -> bytes:
+        """Render all metrics in Prometheus text format"""
+        if not os.environ.get(MULTIPROC_DIR_ENV):
+            return generate_latest(self._registry)
+
+        # Sum the samples every worker wrote to the shared directory
+        collected = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return generate_latest(collected)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop the live gauges of a worker that has exited"""
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        multiprocess.mark_process_dead(pid)
+
+
+# Process-wide registry
+registry = MetricsRegistry()
@@ -0,0 +1,156 @@
+"""Per-request stage timing with Server-Timing headers"""
+
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.metrics import registry
+
+STAGE_DURATION = registry.histogram(
+    "request_stage_duration_seconds",
+    "Time spent in each stage of a request",
+    ["stage"],
+)
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "Time until the response headers are sent",
+    ["path"],
+)
+
+_current: ContextVar[Optional["RequestTimings"]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class RequestTimings:
+    """Stage durations and counters collected while serving one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.notes: Dict[str, str] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Add time spent in a stage; repeated stages accumulate"""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name: str, amount: float = 1) -> None:
+        """Increase a per-request counter such as the number of tokens"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def note(self, stage: str, description: str) -> None:
+        """Attach a short description to a stage, e.g. a cache hit or miss"""
+        self.notes[stage] = description
+
+    def elapsed(self) -> float:
+        """Seconds since the request started"""
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Format the stages recorded so far as a Server-Timing header value"""
+        entries = []
+        for stage in dict.fromkeys([*self.stages, *self.notes]):
+            entry = stage
+            if stage in self.notes:
+                entry += f'; desc="{self.notes[stage]}"'
+            if stage in self.stages:
+                entry += f"; dur={self.stages[stage] * 1000:.1f}"
+            entries.append(entry)
+        entries.append(f"total; dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Summarize the request for the final SSE stats event"""
+        stats = {
+            f"{stage}_ms": round(seconds * 1000, 1)
+            for stage, seconds in self.stages.items()
+        }
+        stats.update(self.counters)
+        stats["total_ms"] = round(self.elapsed() * 1000, 1)
+        return stats
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Timings of the request being served, if any"""
+    return _current.get()
+
+
+def record(stage: str, seconds: float) -> None:
+    """Record a stage duration in the histogram and the current request"""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def note(stage: str, description: str) -> None:
+    """Describe a stage of the current request"""
+    timings = _current.get()
+    if timings is not None:
+        timings.note(stage, description)
+
+
+@contextmanager
+def track(stage: str) -> Iterator[None]:
+    """Time the enclosed block as a request stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+def timed(stage: str) -> Callable:
+    """Decorate a coroutine function so every call is timed as a stage"""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track(stage):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class ServerTimingMiddleware:
+    """Collect stage timings per request and send them as Server-Timing
+
+    Stages that finish before the response starts are included in the
+    header; for streamed responses the rest is reported in the stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.server_timing())
+                REQUEST_DURATION.observe(timings.elapsed(), path=_route_path(scope))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+
+def _route_path(scope) -> str:
+    """Route template of a request, to keep the path label bounded"""
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
@@ -0,0 +1,8 @@
+"""Gunicorn settings used by run.sh"""
+
+from app.core.metrics import mark_process_dead
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited or crashed"""
+    mark_process_dead(worker.pid)
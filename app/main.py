@@ -1,31 +1,82 @@
 """Main FastAPI application"""
 
+import asyncio
+import os
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app.core.admission import OverloadedError
+from app.core.background import drain
 from app.core.config import settings
-from app.api import chat
+from app.core.metrics import mark_process_dead, registry
+from app.core.timing import ServerTimingMiddleware
+from app.api import chat, search
+from app.rag import get_rag_service
 from app.services.redis_service import get_redis_service
 
 
+async def warm_up_rag_service(app: FastAPI) -> bool:
+    """Build and warm up the RAG service, marking the app ready on success"""
+    try:
+        started = time.perf_counter()
+        rag_service = await asyncio.to_thread(get_rag_service)
+        timings = await rag_service.warmup()
+        for stage, seconds in timings.items():
+            print(f"   ⏱️  {stage}: {seconds:.2f}s")
+        print(f"✅ RAG service warm ({time.perf_counter() - started:.2f}s)")
+        app.state.ready = True
+        return True
+    except Exception as e:
+        print(f"❌ RAG service warm-up failed: {str(e)}")
+        return False
+
+
+async def retry_warm_up(app: FastAPI, delay: float = 1.0, max_delay: float = 60.0):
+    """Retry a failed warm-up with exponential backoff until it succeeds
+
+    A transient Chroma or Redis error at boot would otherwise leave /ready
+    failing for the life of the worker.
+    """
+    while True:
+        print(f"🔁 Retrying RAG service warm-up in {delay:.0f}s")
+        await asyncio.sleep(delay)
+        if await warm_up_rag_service(app):
+            return
+        delay = min(delay * 2, max_delay)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     print("🚀 Starting Azerbaijan Legal RAG API...")
 
+    app.state.ready = False
+
     # Initialize Redis connection
+    started = time.perf_counter()
     redis_service = await get_redis_service()
-    print("✅ Redis connected")
+    print(f"✅ Redis connected ({time.perf_counter() - started:.2f}s)")
+
+    # Build and warm up the RAG service before accepting chat traffic, and
+    # keep retrying in the background if that fails
+    retry_task = None
+    if not await warm_up_rag_service(app):
+        retry_task = asyncio.create_task(retry_warm_up(app))
 
     yield
 
     # Shutdown
     print("🛑 Shutting down...")
+    if retry_task is not None:
+        retry_task.cancel()
+    await drain()
     if redis_service:
         await redis_service.disconnect()
+    mark_process_dead(os.getpid())
     print("✅ Cleanup complete")
 
 
@@ -45,8 +96,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Time each request stage and report it in a Server-Timing header
+app.add_middleware(ServerTimingMiddleware)
+
+
+@app.exception_handler(OverloadedError)
+async def overloaded_handler(request: Request, exc: OverloadedError):
+    """Shed load with a fast 429 instead of queueing past the deadline"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "stage": exc.stage},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 
 # Health check endpoint
 @app.get("/health")
@@ -59,6 +124,23 @@ async def health_check():
     }
 
 
+# Readiness endpoint
+@app.get("/ready")
+async def readiness_check():
+    """Report whether this worker has finished warming up"""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+
+    return {"status": "ready"}
+
+
+# Metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose metrics of every worker in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # API info endpoint
 @app.get("/")
 async def root():
@@ -71,6 +153,7 @@ async def root():
             "chat": f"{settings.api_prefix}/chat",
             "chat_stream": f"{settings.api_prefix}/chat/stream",
             "chat_history": f"{settings.api_prefix}/chat/history/{{session_id}}",
+            "search": f"{settings.api_prefix}/search",
         },
     }
 
@@ -79,6 +162,7 @@ async def root():
 
 # Include routers
 app.include_router(chat.router, prefix=settings.api_prefix)
+app.include_router(search.router, prefix=settings.api_prefix)
 
 
 # Global exception handler
@@ -14,6 +14,14 @@ class MessageRole(str, Enum):
     SYSTEM = "system"
 
 
+class AnswerStatus(str, Enum):
+    """How a streamed answer ended"""
+
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    ERROR = "error"
+
+
 class ChatMessage(BaseModel):
     """Individual chat message"""
 
@@ -33,6 +41,13 @@ class ChatRequest(BaseModel):
     include_sources: bool = Field(default=True, description="Include source references")
 
 
+class BatchChatRequest(BaseModel):
+    """Batch chat request model"""
+
+    questions: List[str] = Field(..., min_length=1, description="Questions to answer")
+    include_sources: bool = Field(default=True, description="Include source references")
+
+
 class SourceReference(BaseModel):
     """Source reference for a legal document"""
 
@@ -54,12 +69,24 @@ class ChatResponse(BaseModel):
     processing_time: float = Field(..., description="Processing time in seconds")
 
 
+class BatchChatResult(BaseModel):
+    """One answered question of a batch, sent as an NDJSON line"""
+
+    index: int = Field(..., description="Position of the question in the request")
+    question: str
+    answer: str
+    sources: List[SourceReference] = []
+    cached: bool = False
+    error: Optional[str] = None
+
+
 class StreamChunk(BaseModel):
     """Streaming response chunk"""
 
-    type: str = Field(..., description="Chunk type: content/sources/error/done")
+    type: str = Field(..., description="Chunk type: content/sources/stats/error/done")
     content: Optional[str] = None
     sources: Optional[List[SourceReference]] = None
+    stats: Optional[Dict[str, float]] = None
     error: Optional[str] = None
     done: bool = False
 
@@ -73,3 +100,5 @@ class ChatSession(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     last_activity: datetime = Field(default_factory=datetime.utcnow)
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    # Record of the messages compacted out of the history
+    summary: Optional[Dict[str, Any]] = None
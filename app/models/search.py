@@ -0,0 +1,47 @@
+"""Search models for retrieval-only requests"""
+
+from typing import Optional, List
+from pydantic import BaseModel, Field
+
+
+class SearchRequest(BaseModel):
+    """Semantic search request model"""
+
+    query: str = Field(..., description="Search text in Azerbaijani or English")
+    k: int = Field(default=5, ge=1, le=50, description="Number of results to return")
+    offset: int = Field(
+        default=0, ge=0, le=200, description="Number of results to skip"
+    )
+    law_code: Optional[List[str]] = Field(
+        default=None, description="Only return chunks from these law codes"
+    )
+    chunk_type: Optional[List[str]] = Field(
+        default=None, description="Only return chunks of these types"
+    )
+
+
+class SearchResult(BaseModel):
+    """A ranked legal text chunk"""
+
+    content: str
+    law_code: str
+    law_name_az: str = ""
+    law_name_en: str = ""
+    chunk_type: Optional[str] = None
+    chapter: Optional[str] = None
+    section: Optional[str] = None
+    article_number: Optional[str] = None
+    article_reference: Optional[str] = None
+    chunk_id: Optional[str] = None
+    relevance_score: float
+
+
+class SearchResponse(BaseModel):
+    """Semantic search response model"""
+
+    query: str
+    results: List[SearchResult] = []
+    k: int
+    offset: int
+    count: int
+    processing_time: float = Field(..., description="Processing time in seconds")
@@ -0,0 +1,111 @@
+"""Redis-backed cache of generated answers"""
+
+import hashlib
+import time
+from typing import Iterable, List, Optional
+
+from redis.asyncio import Redis
+
+from app.core.metrics import registry
+from app.rag.text_processing import TextNormalizer
+
+ANSWER_CACHE_REQUESTS = registry.counter(
+    "answer_cache_requests_total", "Answer cache lookups by result", ["result"]
+)
+
+
+class AnswerCache:
+    """Cache answers keyed by question, retrieved chunks, model and prompt
+
+    Entries expire after ``ttl`` seconds. An index sorted set scored by
+    insertion time bounds the cache to ``max_entries`` by evicting the
+    oldest answers first. A sorted set per law code lists the answers
+    citing it, so they can be deleted when the law changes.
+    """
+
+    def __init__(
+        self,
+        redis_client: Redis,
+        ttl: int = 86400,
+        max_entries: int = 10000,
+        prefix: str = "answer:",
+    ):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.index_key = f"{prefix}index"
+
+    def build_key(
+        self,
+        question: str,
+        chunk_texts: List[str],
+        model: str,
+        prompt_version: str,
+    ) -> str:
+        """Build the cache key for a question and its retrieved chunk set
+
+        Chunks are identified by a digest of their text rather than their
+        ids, which are positional and point at other text after re-ingestion.
+        """
+        parts = [
+            TextNormalizer.normalize_question(question),
+            model,
+            prompt_version,
+            *sorted(hashlib.sha256(text.encode()).hexdigest() for text in chunk_texts),
+        ]
+        digest = hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+        return f"{self.prefix}{digest}"
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a cached answer, if any"""
+        try:
+            answer = await self.redis_client.get(key)
+        except Exception:
+            answer = None
+
+        ANSWER_CACHE_REQUESTS.inc(result="hit" if answer is not None else "miss")
+        return answer
+
+    def _law_key(self, law_code: str) -> str:
+        return f"{self.prefix}law:{law_code}"
+
+    async def set(self, key: str, answer: str, law_codes: Iterable[str] = ()) -> None:
+        """Store an answer and evict the oldest entries beyond the size bound"""
+        now = time.time()
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.setex(key, self.ttl, answer)
+                pipe.zadd(self.index_key, {key: now})
+                pipe.zremrangebyscore(self.index_key, "-inf", now - self.ttl)
+                for law_code in {code for code in law_codes if code}:
+                    law_key = self._law_key(law_code)
+                    pipe.zadd(law_key, {key: now})
+                    pipe.zremrangebyscore(law_key, "-inf", now - self.ttl)
+                    pipe.expire(law_key, self.ttl)
+                pipe.zcard(self.index_key)
+                *_, size = await pipe.execute()
+
+            overflow = size - self.max_entries
+            if overflow > 0:
+                evicted = await self.redis_client.zpopmin(self.index_key, overflow)
+                if evicted:
+                    await self.redis_client.delete(*[member for member, _ in evicted])
+        except Exception:
+            pass
+
+    async def invalidate_law_code(self, law_code: str, batch_size: int = 500) -> int:
+        """Delete every cached answer citing a law code, returning the count"""
+        law_key = self._law_key(law_code)
+        keys = await self.redis_client.zrange(law_key, 0, -1)
+
+        deleted = 0
+        for i in range(0, len(keys), batch_size):
+            batch = keys[i : i + batch_size]
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(*batch)
+                pipe.zrem(self.index_key, *batch)
+                deleted += (await pipe.execute())[0]
+
+        await self.redis_client.delete(law_key)
+        return deleted
@@ -0,0 +1,103 @@
+"""Dynamic micro-batching for query embeddings"""
+
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.metrics import registry
+
+BATCH_SIZE = registry.histogram(
+    "embedding_batch_size",
+    "Number of queries encoded per model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+QUEUE_WAIT = registry.histogram(
+    "embedding_queue_wait_seconds",
+    "Time a query waited before its batch was encoded",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+class EmbeddingBatcher:
+    """Collect concurrent query embeddings into a single encode call
+
+    Queries submitted while the model is busy, or within ``max_wait`` seconds
+    of the first queued query, are encoded together in one batch of at most
+    ``max_batch_size`` texts. Each caller awaits its own future.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 16,
+        max_wait: float = 0.005,
+    ):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_worker(self) -> None:
+        """Start the batching task on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, text: str) -> List[float]:
+        """Queue a text and wait for its embedding"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, future, self._loop.time()))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future, float]]:
+        """Wait for the first query, then gather more until the batch closes"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # Callers that went away no longer need their embedding
+        return [item for item in batch if not item[1].done()]
+
+    async def _run(self) -> None:
+        """Encode batches until the loop shuts down"""
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+
+            started = self._loop.time()
+            for _, _, enqueued in batch:
+                QUEUE_WAIT.observe(started - enqueued)
+            BATCH_SIZE.observe(len(batch))
+
+            try:
+                vectors = await asyncio.to_thread(
+                    self.encode, [text for text, _, _ in batch]
+                )
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector.tolist())
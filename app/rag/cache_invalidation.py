@@ -0,0 +1,31 @@
+"""Law code generations shared by every worker through Redis"""
+
+from typing import Dict, Iterable
+
+from redis.asyncio import Redis
+
+
+class LawCodeGenerations:
+    """Per-law-code generation counters for invalidating cached answers
+
+    Cached answers remember the generation of each law code they cite when
+    they were retrieved. Bumping a law code's generation makes every such
+    answer stale in every worker, which discards it on its next hit.
+    """
+
+    def __init__(self, redis_client: Redis, key: str = "cache:law_generations"):
+        self.redis_client = redis_client
+        self.key = key
+
+    async def get(self, law_codes: Iterable[str]) -> Dict[str, int]:
+        """Current generation of each law code, 0 if never bumped"""
+        codes = sorted({code for code in law_codes if code})
+        if not codes:
+            return {}
+
+        values = await self.redis_client.hmget(self.key, codes)
+        return {code: int(value or 0) for code, value in zip(codes, values)}
+
+    async def bump(self, law_code: str) -> int:
+        """Invalidate every cached answer citing a law code"""
+        return await self.redis_client.hincrby(self.key, law_code, 1)
@@ -0,0 +1,189 @@
+"""Single-flight coalescing of identical in-flight streaming queries"""
+
+import asyncio
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+)
+
+from app.core.metrics import registry
+
+COALESCED_QUERIES = registry.counter(
+    "coalesced_queries_total",
+    "Streaming queries by whether they drove the pipeline or joined one",
+    ["role"],
+)
+
+
+class _Flight:
+    """Shared state of one in-flight query"""
+
+    def __init__(self):
+        self.result: Optional[Dict[str, Any]] = None
+        self.has_stream = False
+        self.deltas: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.ready = asyncio.Event()
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        """Wake up subscribers waiting for new deltas"""
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class _Subscription:
+    """One subscriber's answer stream, which leaves its flight when it ends
+
+    The subscriber leaves when the stream is exhausted, fails, is closed or
+    is dropped. An async generator that never started would skip its
+    ``finally`` on close, which would keep the flight running for nobody if
+    the client left before the first delta.
+    """
+
+    def __init__(self, stream: AsyncIterator[str], leave: Callable[[], None]):
+        self._stream = stream
+        self._leave = leave
+        self._left = False
+
+    def _unsubscribe(self) -> None:
+        if not self._left:
+            self._left = True
+            self._leave()
+
+    def __aiter__(self) -> "_Subscription":
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            return await self._stream.__anext__()
+        except BaseException:
+            self._unsubscribe()
+            raise
+
+    async def aclose(self) -> None:
+        """Close the replay stream and leave the flight"""
+        try:
+            await self._stream.aclose()
+        finally:
+            self._unsubscribe()
+
+    def __del__(self):
+        self._unsubscribe()
+
+
+class StreamCoalescer:
+    """Share one query pipeline and token stream between identical requests
+
+    The first request for a key drives the pipeline in a background task.
+    Later requests for the same key subscribe to the same result and replay
+    the deltas produced so far from a fan-out buffer before following the
+    live stream. The pipeline is cancelled once every subscriber has left.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def run(
+        self, key: Hashable, start: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Run ``start`` once per key and return a per-caller result copy"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._drive(key, flight, start))
+            COALESCED_QUERIES.inc(role="leader")
+        else:
+            COALESCED_QUERIES.inc(role="follower")
+
+        flight.subscribers += 1
+        try:
+            await flight.ready.wait()
+        except asyncio.CancelledError:
+            self._unsubscribe(key, flight)
+            raise
+
+        if flight.result is None:
+            self._unsubscribe(key, flight)
+            raise flight.error
+
+        result = dict(flight.result)
+        if flight.has_stream:
+            result["answer_stream"] = _Subscription(
+                self._replay(flight), lambda: self._unsubscribe(key, flight)
+            )
+        else:
+            self._unsubscribe(key, flight)
+        return result
+
+    async def _drive(
+        self,
+        key: Hashable,
+        flight: _Flight,
+        start: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> None:
+        """Run the pipeline and copy its deltas into the fan-out buffer"""
+        try:
+            result = dict(await start())
+            stream = result.pop("answer_stream", None)
+            flight.result = result
+            flight.has_stream = stream is not None
+            flight.ready.set()
+
+            if stream is not None:
+                async for delta in stream:
+                    flight.deltas.append(delta)
+                    flight.notify()
+
+        except asyncio.CancelledError as e:
+            flight.error = e
+            raise
+
+        except Exception as e:
+            flight.error = e
+
+        finally:
+            flight.done = True
+            flight.ready.set()
+            flight.notify()
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    @staticmethod
+    async def _replay(flight: _Flight) -> AsyncGenerator[str, None]:
+        """Replay buffered deltas, then follow the live stream"""
+        index = 0
+        while True:
+            while index < len(flight.deltas):
+                yield flight.deltas[index]
+                index += 1
+
+            if flight.done:
+                if flight.error is not None:
+                    raise flight.error
+                return
+
+            await flight.changed.wait()
+
+    def _unsubscribe(self, key: Hashable, flight: _Flight) -> None:
+        """Drop a subscriber and cancel the pipeline once nobody is left"""
+        flight.subscribers -= 1
+        if flight.subscribers > 0 or flight.done:
+            return
+
+        # Nobody reads this answer any more; stop paying for it
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if flight.task is not None:
+            flight.task.cancel()
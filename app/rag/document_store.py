@@ -0,0 +1,150 @@
+"""On-disk store of document embeddings keyed by chunk content"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+DIGEST_SIZE = 32  # SHA-256
+
+
+class DocumentEmbeddingStore:
+    """Persistent embeddings keyed by (model name, SHA-256 of the chunk text)
+
+    Each model gets its own directory holding ``vectors.f32``, an
+    append-only float32 matrix read through a memory map, and ``keys.bin``,
+    the digest of each row in the same order. Rows are only ever appended,
+    so an interrupted write at worst leaves a partial row, which is dropped
+    on the next load.
+    """
+
+    def __init__(self, directory: str, model_name: str):
+        self.model_name = model_name
+        self.path = Path(directory) / re.sub(r"[^\w.-]+", "_", model_name)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.dim: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._rows = 0
+        self._index: Dict[bytes, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._load()
+
+    @property
+    def _meta_file(self) -> Path:
+        return self.path / "meta.json"
+
+    @property
+    def _vectors_file(self) -> Path:
+        return self.path / "vectors.f32"
+
+    @property
+    def _keys_file(self) -> Path:
+        return self.path / "keys.bin"
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @staticmethod
+    def digest(text: str) -> bytes:
+        """Content key of a chunk"""
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def _load(self) -> None:
+        """Index the rows already on disk"""
+        if not self._meta_file.exists():
+            return
+
+        meta = json.loads(self._meta_file.read_text(encoding="utf-8"))
+        if meta["model"] != self.model_name:
+            raise ValueError(
+                f"Embedding store at {self.path} belongs to model {meta['model']}"
+            )
+        self.dim = meta["dim"]
+
+        keys = self._keys_file.read_bytes() if self._keys_file.exists() else b""
+        vector_bytes = (
+            self._vectors_file.stat().st_size if self._vectors_file.exists() else 0
+        )
+        self._rows = min(len(keys) // DIGEST_SIZE, vector_bytes // (4 * self.dim))
+        self._index = {
+            keys[row * DIGEST_SIZE : (row + 1) * DIGEST_SIZE]: row
+            for row in range(self._rows)
+        }
+        self._map()
+
+    def _map(self) -> None:
+        """Memory-map the complete rows of the vector file"""
+        self._vectors = None
+        if self._rows:
+            self._vectors = np.memmap(
+                self._vectors_file,
+                dtype="<f4",
+                mode="r",
+                shape=(self._rows, self.dim),
+            )
+
+    @staticmethod
+    def _append(path: Path, offset: int, data: bytes) -> None:
+        """Write ``data`` at ``offset``, dropping any partial tail first"""
+        with open(path, "r+b" if path.exists() else "wb") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(data)
+
+    def get(self, digest: bytes) -> Optional[np.ndarray]:
+        """Stored embedding for a content key, if any"""
+        row = self._index.get(digest)
+        return self._vectors[row] if row is not None else None
+
+    def add_many(self, digests: List[bytes], vectors: np.ndarray) -> None:
+        """Append embeddings for content keys not yet stored"""
+        vectors = np.asarray(vectors, dtype="<f4")
+        if not len(digests):
+            return
+
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            self._meta_file.write_text(
+                json.dumps({"model": self.model_name, "dim": self.dim}),
+                encoding="utf-8",
+            )
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Expected {self.dim}-dimensional embeddings, got {vectors.shape[1]}"
+            )
+
+        # Vectors go first, so a crash never leaves a key without its row
+        self._append(self._vectors_file, self._rows * 4 * self.dim, vectors.tobytes())
+        self._append(self._keys_file, self._rows * DIGEST_SIZE, b"".join(digests))
+
+        for digest in digests:
+            self._index[digest] = self._rows
+            self._rows += 1
+        self._map()
+
+    def embed(
+        self,
+        texts: List[str],
+        embed_fn: Callable[[List[str]], List[List[float]]],
+    ) -> List[List[float]]:
+        """Embed texts, running ``embed_fn`` only on chunks not stored yet"""
+        digests = [self.digest(text) for text in texts]
+
+        missing: Dict[bytes, str] = {}
+        for digest, text in zip(digests, texts):
+            if digest not in self._index and digest not in missing:
+                missing[digest] = text
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        if missing:
+            vectors = embed_fn(list(missing.values()))
+            self.add_many(list(missing.keys()), vectors)
+
+        return [self.get(digest).tolist() for digest in digests]
@@ -0,0 +1,121 @@
+"""Inference backends for the sentence transformer embedding model
+
+``torch`` runs the model as published. ``onnx`` runs an ONNX export of it on
+ONNX Runtime, and ``onnx-int8`` a dynamically int8-quantized copy of that
+export. Exports are created on first use and kept under the model directory,
+so later loads only read them from disk.
+
+The ONNX backends need ``sentence-transformers[onnx]`` (optimum and
+onnxruntime).
+"""
+
+import re
+from pathlib import Path
+
+from sentence_transformers import SentenceTransformer
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_MODEL_FILE = "onnx/model.onnx"
+
+
+def quantized_model_file(quantization: str) -> str:
+    """File written by ``export_dynamic_quantized_onnx_model``"""
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+def export_path(model_dir: str, model_name: str) -> Path:
+    """Directory holding the ONNX exports of a model"""
+    return Path(model_dir) / re.sub(r"[^\w.-]+", "_", model_name)
+
+
+def _session_options(intra_op_threads: int, inter_op_threads: int):
+    """ONNX Runtime session options with the requested thread counts"""
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        options.inter_op_num_threads = inter_op_threads
+    return options
+
+
+def _set_torch_threads(intra_op_threads: int, inter_op_threads: int) -> None:
+    """Apply thread counts to torch, which shares them process-wide"""
+    if not intra_op_threads and not inter_op_threads:
+        return
+
+    import torch
+
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            # Can only be set before torch runs its first parallel operation
+            print("⚠️  torch inter-op threads already fixed for this process")
+
+
+def _export_onnx(model_name: str, path: Path) -> None:
+    """Export the model to ONNX unless an export already exists"""
+    if (path / ONNX_MODEL_FILE).exists():
+        return
+
+    print(f"📦 Exporting {model_name} to ONNX in {path}...")
+    model = SentenceTransformer(model_name, backend="onnx")
+    model.save(str(path))
+
+
+def _export_quantized(path: Path, quantization: str) -> None:
+    """Write a dynamically int8-quantized copy of the ONNX export"""
+    if (path / quantized_model_file(quantization)).exists():
+        return
+
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    print(f"📦 Quantizing ONNX model to int8 ({quantization})...")
+    model = SentenceTransformer(
+        str(path), backend="onnx", model_kwargs={"file_name": ONNX_MODEL_FILE}
+    )
+    export_dynamic_quantized_onnx_model(model, quantization, str(path))
+
+
+def load_model(
+    model_name: str,
+    backend: str = "torch",
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+    quantization: str = "avx2",
+    model_dir: str = ".models",
+) -> SentenceTransformer:
+    """Load the model on the given backend
+
+    Thread counts of 0 keep the runtime's default.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend {backend!r}, expected one of {BACKENDS}"
+        )
+
+    if backend == "torch":
+        _set_torch_threads(intra_op_threads, inter_op_threads)
+        return SentenceTransformer(model_name)
+
+    path = export_path(model_dir, model_name)
+    _export_onnx(model_name, path)
+
+    file_name = ONNX_MODEL_FILE
+    if backend == "onnx-int8":
+        _export_quantized(path, quantization)
+        file_name = quantized_model_file(quantization)
+
+    return SentenceTransformer(
+        str(path),
+        backend="onnx",
+        model_kwargs={
+            "file_name": file_name,
+            "provider": "CPUExecutionProvider",
+            "session_options": _session_options(intra_op_threads, inter_op_threads),
+        },
+    )
@@ -0,0 +1,83 @@
+"""Process pool that embeds documents with one model per worker
+
+Used by ingestion to spread a corpus over all cores. Each worker loads its
+own copy of the model and pins its thread count, so workers don't compete
+for the same cores. Memory grows with the worker count: every worker holds
+a full model.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.rag.embedding_backends import load_model
+
+# The worker's model, loaded once by ``_init_worker``
+_model = None
+
+
+def _init_worker(
+    model_name: str, backend: str, threads: int, quantization: str, model_dir: str
+) -> None:
+    global _model
+    _model = load_model(
+        model_name,
+        backend=backend,
+        intra_op_threads=threads,
+        inter_op_threads=1,
+        quantization=quantization,
+        model_dir=model_dir,
+    )
+
+
+def _encode(texts: List[str]) -> np.ndarray:
+    return np.asarray(_model.encode(texts, convert_to_tensor=False), np.float32)
+
+
+class EmbeddingPool:
+    """Worker processes that each encode whole batches of texts
+
+    ``threads`` is the intra-op thread count per worker; 0 divides the
+    machine's cores evenly between the workers. Workers start, and load
+    their model, on the first batch.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int,
+        threads: int = 0,
+        backend: Optional[str] = None,
+    ):
+        self.workers = workers
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            # Forking a process that already holds a model is unsafe
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                model_name,
+                backend or settings.embedding_backend,
+                self.threads,
+                settings.embedding_quantization,
+                settings.embedding_model_dir,
+            ),
+        )
+
+    def map(self, batches: List[List[str]]) -> Iterator[np.ndarray]:
+        """Encode batches across the workers, yielding results in order"""
+        return self.executor.map(_encode, batches)
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def __enter__(self) -> "EmbeddingPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
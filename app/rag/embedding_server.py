@@ -0,0 +1,186 @@
+"""Shared embedding model served to API workers over a Unix socket
+
+One process loads the model and serves ``encode`` requests, so gunicorn
+workers can scale for I/O concurrency without each holding a copy of the
+weights. Run it with ``python -m app.rag.embedding_server`` and point the
+workers at the socket with ``EMBEDDING_SERVER_SOCKET``.
+
+Every message is a 4-byte big-endian length followed by the payload. A
+request payload is a JSON list of texts. A response payload is a status
+byte: 0 followed by the row count, the dimension and the float32 vectors,
+or 1 followed by a UTF-8 error message.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.rag.embeddings import HuggingFaceEmbedding
+
+_LENGTH = struct.Struct("!I")
+_SHAPE = struct.Struct("!II")
+_OK = b"\x00"
+_ERROR = b"\x01"
+
+
+def encode_vectors(vectors: np.ndarray) -> bytes:
+    """Build a success response payload"""
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    return _OK + _SHAPE.pack(*vectors.shape) + vectors.tobytes()
+
+
+def decode_vectors(payload: bytes) -> np.ndarray:
+    """Parse a response payload, raising on server errors"""
+    if payload[:1] == _ERROR:
+        raise RuntimeError(f"Embedding server error: {payload[1:].decode()}")
+
+    rows, dim = _SHAPE.unpack_from(payload, 1)
+    vectors = np.frombuffer(payload, dtype="<f4", offset=1 + _SHAPE.size)
+    return vectors.reshape(rows, dim)
+
+
+class EmbeddingServer:
+    """Serve a locally loaded embedding model on a Unix socket
+
+    Texts from concurrent requests, across all connected workers, go
+    through the model's micro-batcher so they are encoded together.
+    """
+
+    def __init__(self, embedding: HuggingFaceEmbedding, socket_path: str):
+        self.embedding = embedding
+        self.socket_path = socket_path
+
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        vectors = await asyncio.gather(
+            *[self.embedding.batcher.submit(text) for text in texts]
+        )
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer requests from one worker connection until it closes"""
+        try:
+            while True:
+                try:
+                    (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                    request = await reader.readexactly(size)
+                except asyncio.IncompleteReadError:
+                    return
+
+                try:
+                    payload = encode_vectors(await self._encode(json.loads(request)))
+                except Exception as e:
+                    payload = _ERROR + str(e).encode()
+
+                writer.write(_LENGTH.pack(len(payload)) + payload)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        """Listen on the socket until cancelled"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        server = await asyncio.start_unix_server(self.handle, path=self.socket_path)
+        print(f"✅ Embedding server listening on {self.socket_path}")
+        async with server:
+            await server.serve_forever()
+
+
+class RemoteEmbedding(HuggingFaceEmbedding):
+    """Embedding wrapper that encodes through a shared embedding server
+
+    Caching and query micro-batching work as in HuggingFaceEmbedding; only
+    the model call is sent over the socket.
+    """
+
+    def __init__(self, model_name: str, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        super().__init__(model_name)
+
+    def _load_model(self) -> None:
+        """The model lives in the embedding server"""
+        return None
+
+    def _connection(self) -> socket.socket:
+        """Get this thread's connection to the server"""
+        conn: Optional[socket.socket] = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            conn.connect(self.socket_path)
+            self._local.conn = conn
+        return conn
+
+    def _close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def _recv_exactly(self, conn: socket.socket, size: int) -> bytes:
+        buffer = bytearray()
+        while len(buffer) < size:
+            data = conn.recv(size - len(buffer))
+            if not data:
+                raise ConnectionError("Embedding server closed the connection")
+            buffer.extend(data)
+        return bytes(buffer)
+
+    def _request(self, texts: List[str]) -> np.ndarray:
+        conn = self._connection()
+        request = json.dumps(texts, ensure_ascii=False).encode()
+        conn.sendall(_LENGTH.pack(len(request)) + request)
+
+        (size,) = _LENGTH.unpack(self._recv_exactly(conn, _LENGTH.size))
+        return decode_vectors(self._recv_exactly(conn, size))
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode a batch of texts on the embedding server"""
+        try:
+            return self._request(texts)
+        except OSError:
+            # The server may have restarted; retry once on a fresh connection
+            self._close()
+            try:
+                return self._request(texts)
+            except OSError:
+                self._close()
+                raise
+
+
+def main():
+    """Main function to run the embedding server"""
+    parser = argparse.ArgumentParser(description="Serve the shared embedding model")
+    parser.add_argument(
+        "--socket",
+        default=settings.embedding_server_socket or "/tmp/legal-rag-embeddings.sock",
+        help="Unix socket path to listen on",
+    )
+    parser.add_argument("--model", default=settings.embedding_model)
+
+    args = parser.parse_args()
+
+    print(f"🚀 Loading embedding model {args.model}...")
+    embedding = HuggingFaceEmbedding(args.model)
+
+    try:
+        asyncio.run(EmbeddingServer(embedding, args.socket).serve())
+    except KeyboardInterrupt:
+        print("🛑 Embedding server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,120 @@
 """Embeddings module with caching support"""
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sentence_transformers import SentenceTransformer
+import asyncio
 import hashlib
 import json
+import struct
 import redis
 import numpy as np
 from app.core.config import settings
+from app.core.metrics import registry
+from app.core.timing import note, track
+from app.rag.batching import EmbeddingBatcher
+from app.rag.embedding_backends import load_model
+from app.rag.embedding_pool import EmbeddingPool
+from app.rag.lru_cache import LRUCache
+from app.services.redis_service import get_redis_service
+
+EMBEDDING_CACHE_REQUESTS = registry.counter(
+    "embedding_cache_requests_total",
+    "Embedding cache lookups by tier and result",
+    ["tier", "result"],
+)
+EMBEDDING_CACHE_MEMORY_ENTRIES = registry.gauge(
+    "embedding_cache_memory_entries", "Query embeddings held in process memory"
+)
+
+EMBEDDING_CACHE_TTL = 86400  # 24 hours
+
+# Cached vectors are a header (format version, dtype, dimension) followed by
+# the raw little-endian values; 4 bytes keeps float32 values aligned
+CACHE_FORMAT_VERSION = 1
+CACHE_HEADER = struct.Struct("<BBH")
+CACHE_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+CACHE_DTYPE_CODES = {"float32": 1, "float16": 2}
+
+
+def encode_vector(vector: np.ndarray, dtype: str = "float32") -> bytes:
+    """Pack a vector for the embedding cache"""
+    code = CACHE_DTYPE_CODES[dtype]
+    values = np.asarray(vector, dtype=CACHE_DTYPES[code])
+    header = CACHE_HEADER.pack(CACHE_FORMAT_VERSION, code, len(values))
+    return header + values.tobytes()
+
+
+def decode_vector(data: bytes) -> Optional[np.ndarray]:
+    """Unpack a cached vector without copying it
+
+    Entries written as JSON lists by earlier releases are still read.
+    Unknown formats and truncated or corrupt values return None and are
+    treated as misses.
+    """
+    try:
+        if data[:1] == b"[":
+            return np.asarray(json.loads(data), dtype=np.float32)
+
+        version, code, dim = CACHE_HEADER.unpack_from(data)
+        if version != CACHE_FORMAT_VERSION or code not in CACHE_DTYPES:
+            return None
+        return np.frombuffer(
+            data, dtype=CACHE_DTYPES[code], count=dim, offset=CACHE_HEADER.size
+        )
+    except (struct.error, ValueError):
+        return None
 
 
 class HuggingFaceEmbedding:
-    """Custom HuggingFace embedding wrapper with caching support"""
+    """Custom HuggingFace embedding wrapper with caching support
+
+    Query embeddings are cached in two tiers: an in-process LRU, then Redis.
+    The async methods reach Redis through the shared ``RedisService`` pool;
+    the sync methods, used by scripts and worker threads, use their own
+    client.
+
+    ``backend`` picks the inference runtime (see ``embedding_backends``) and
+    defaults to the ``embedding_backend`` setting.
+    """
 
-    def __init__(self, model_name: str = "intfloat/multilingual-e5-large"):
+    def __init__(
+        self,
+        model_name: str = "intfloat/multilingual-e5-large",
+        backend: Optional[str] = None,
+    ):
         self.model_name = model_name
-        self.model = SentenceTransformer(model_name)
+        self.backend = backend or settings.embedding_backend
+        self.model = self._load_model()
         self.redis_client = self._init_redis()
         self.cache_enabled = self.redis_client is not None
+        self.cache_dtype = settings.embedding_cache_dtype
+        self.memory_cache = LRUCache(
+            max_entries=settings.embedding_cache_memory_entries,
+            ttl=settings.embedding_cache_memory_ttl,
+        )
+        self.batcher = EmbeddingBatcher(
+            self.encode,
+            max_batch_size=settings.embedding_batch_max_size,
+            max_wait=settings.embedding_batch_max_wait_ms / 1000,
+        )
+
+    @property
+    def model_id(self) -> str:
+        """Model name qualified by backend, since backends' vectors differ slightly"""
+        if self.backend == "torch":
+            return self.model_name
+        return f"{self.model_name}@{self.backend}"
+
+    def _load_model(self) -> Optional[SentenceTransformer]:
+        """Load the sentence transformer that encodes texts"""
+        return load_model(
+            self.model_name,
+            backend=self.backend,
+            intra_op_threads=settings.embedding_intra_op_threads,
+            inter_op_threads=settings.embedding_inter_op_threads,
+            quantization=settings.embedding_quantization,
+            model_dir=settings.embedding_model_dir,
+        )
 
     def _init_redis(self) -> Optional[redis.Redis]:
         """Initialize Redis connection for caching"""
@@ -37,40 +135,184 @@ class HuggingFaceEmbedding:
     def _get_cache_key(self, text: str) -> str:
         """Generate cache key for text"""
         text_hash = hashlib.sha256(text.encode()).hexdigest()
-        return f"embedding:{self.model_name}:{text_hash}"
+        return f"embedding:{self.model_id}:{text_hash}"
+
+    def _get_from_memory(self, cache_keys: List[str]) -> List[Optional[List[float]]]:
+        """Look up embeddings in the in-process tier"""
+        embeddings = []
+        for cache_key in cache_keys:
+            vector = self.memory_cache.get(cache_key)
+            embeddings.append(vector.tolist() if vector is not None else None)
+            result = "hit" if vector is not None else "miss"
+            EMBEDDING_CACHE_REQUESTS.inc(tier="memory", result=result)
+        return embeddings
+
+    def _save_to_memory(self, cache_key: str, embedding: List[float]) -> None:
+        self.memory_cache.set(cache_key, np.asarray(embedding, dtype=np.float32))
+        EMBEDDING_CACHE_MEMORY_ENTRIES.set(len(self.memory_cache))
+
+    def _decode_from_redis(
+        self, cache_keys: List[str], cached: List[Optional[bytes]]
+    ) -> List[Optional[List[float]]]:
+        """Decode Redis values, promoting hits to the in-process tier"""
+        embeddings = []
+        for cache_key, data in zip(cache_keys, cached):
+            vector = decode_vector(data) if data else None
+            embedding = vector.tolist() if vector is not None else None
+            if embedding:
+                self._save_to_memory(cache_key, embedding)
+            embeddings.append(embedding)
+            result = "hit" if embedding else "miss"
+            EMBEDDING_CACHE_REQUESTS.inc(tier="redis", result=result)
+        return embeddings
+
+    def _merge_tiers(
+        self,
+        embeddings: List[Optional[List[float]]],
+        missing: List[int],
+        fetched: List[Optional[List[float]]],
+    ) -> List[Optional[List[float]]]:
+        """Fill memory-tier misses with Redis results and note the outcome"""
+        for i, embedding in zip(missing, fetched):
+            embeddings[i] = embedding
+
+        missing = set(missing)
+        for i, embedding in enumerate(embeddings):
+            if i not in missing:
+                note("embedding_cache", "memory")
+            else:
+                note("embedding_cache", "redis" if embedding else "miss")
+        return embeddings
 
     def _get_from_cache(self, cache_key: str) -> Optional[List[float]]:
         """Try to get embedding from cache"""
-        if not self.cache_enabled:
-            return None
+        return self._get_many_from_cache([cache_key])[0]
 
-        try:
-            cached = self.redis_client.get(cache_key)
-            return json.loads(cached) if cached else None
-        except Exception:
-            return None
+    def _get_many_from_cache(
+        self, cache_keys: List[str]
+    ) -> List[Optional[List[float]]]:
+        """Look up several embeddings, with one Redis round trip for misses"""
+        embeddings = self._get_from_memory(cache_keys)
+        missing = [i for i, embedding in enumerate(embeddings) if not embedding]
+
+        fetched = [None] * len(missing)
+        if missing and self.cache_enabled:
+            keys = [cache_keys[i] for i in missing]
+            try:
+                with track("embedding_cache"):
+                    cached = self.redis_client.mget(keys)
+                fetched = self._decode_from_redis(keys, cached)
+            except Exception:
+                pass
+
+        return self._merge_tiers(embeddings, missing, fetched)
+
+    async def _aget_many_from_cache(
+        self, cache_keys: List[str]
+    ) -> List[Optional[List[float]]]:
+        """Async version of ``_get_many_from_cache`` on the shared pool"""
+        embeddings = self._get_from_memory(cache_keys)
+        missing = [i for i, embedding in enumerate(embeddings) if not embedding]
+
+        fetched = [None] * len(missing)
+        if missing and self.cache_enabled:
+            keys = [cache_keys[i] for i in missing]
+            try:
+                redis_service = await get_redis_service()
+                with track("embedding_cache"):
+                    cached = await redis_service.binary_client.mget(keys)
+                fetched = self._decode_from_redis(keys, cached)
+            except Exception:
+                pass
+
+        return self._merge_tiers(embeddings, missing, fetched)
 
     def _save_to_cache(self, cache_key: str, embedding: List[float]) -> None:
         """Save embedding to cache"""
-        if not self.cache_enabled:
+        self._save_many_to_cache({cache_key: embedding})
+
+    def _save_many_to_cache(self, embeddings: Dict[str, List[float]]) -> None:
+        """Save several embeddings to both tiers, with one Redis round trip"""
+        for cache_key, embedding in embeddings.items():
+            self._save_to_memory(cache_key, embedding)
+
+        if not self.cache_enabled or not embeddings:
             return
 
         try:
-            self.redis_client.setex(
-                cache_key, 86400, json.dumps(embedding)  # 24 hours TTL
-            )
+            pipe = self.redis_client.pipeline(transaction=False)
+            for cache_key, embedding in embeddings.items():
+                pipe.setex(
+                    cache_key,
+                    EMBEDDING_CACHE_TTL,
+                    encode_vector(embedding, self.cache_dtype),
+                )
+            pipe.execute()
         except Exception:
             pass
 
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Embed a list of documents"""
+    async def _asave_many_to_cache(self, embeddings: Dict[str, List[float]]) -> None:
+        """Async version of ``_save_many_to_cache`` on the shared pool"""
+        for cache_key, embedding in embeddings.items():
+            self._save_to_memory(cache_key, embedding)
+
+        if not self.cache_enabled or not embeddings:
+            return
+
+        try:
+            redis_service = await get_redis_service()
+            async with redis_service.binary_client.pipeline(transaction=False) as pipe:
+                for cache_key, embedding in embeddings.items():
+                    pipe.setex(
+                        cache_key,
+                        EMBEDDING_CACHE_TTL,
+                        encode_vector(embedding, self.cache_dtype),
+                    )
+                await pipe.execute()
+        except Exception:
+            pass
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Run the model over a batch of texts"""
+        return self.model.encode(texts, convert_to_tensor=False)
+
+    def _text_lengths(self, texts: List[str]) -> List[int]:
+        """Token count of each text, or characters without a local tokenizer"""
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return [len(text) for text in texts]
+
+        input_ids = tokenizer(texts, add_special_tokens=False, verbose=False)
+        return [len(ids) for ids in input_ids["input_ids"]]
+
+    def embed_documents(
+        self, texts: List[str], pool: Optional[EmbeddingPool] = None
+    ) -> List[List[float]]:
+        """Embed a list of documents
+
+        Texts are batched by token length, longest first, so batches carry
+        little padding, and the embeddings come back in the original order.
+        With a pool the batches are spread over its worker processes.
+        """
+        if not texts:
+            return []
+
         batch_size = 32
-        embeddings = []
+        lengths = self._text_lengths(texts)
+        order = sorted(range(len(texts)), key=lengths.__getitem__, reverse=True)
+        batches = [
+            [texts[i] for i in order[start : start + batch_size]]
+            for start in range(0, len(order), batch_size)
+        ]
 
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i : i + batch_size]
-            batch_embeddings = self.model.encode(batch, convert_to_tensor=False)
-            embeddings.extend(batch_embeddings.tolist())
+        encoded = pool.map(batches) if pool is not None else map(self.encode, batches)
+
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        position = 0
+        for batch_embeddings in encoded:
+            for vector in batch_embeddings:
+                embeddings[order[position]] = vector.tolist()
+                position += 1
 
         return embeddings
 
@@ -84,9 +326,56 @@ class HuggingFaceEmbedding:
             return cached_embedding
 
         # Generate new embedding
-        embedding = self.model.encode([text], convert_to_tensor=False)[0].tolist()
+        embedding = self.encode([text])[0].tolist()
 
         # Cache for future use
         self._save_to_cache(cache_key, embedding)
 
         return embedding
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several query texts with caching, encoding misses in one call"""
+        cache_keys = [self._get_cache_key(text) for text in texts]
+        embeddings = self._get_many_from_cache(cache_keys)
+
+        missing = [i for i, embedding in enumerate(embeddings) if not embedding]
+        if missing:
+            vectors = self.encode([texts[i] for i in missing])
+            for i, vector in zip(missing, vectors):
+                embeddings[i] = vector.tolist()
+            self._save_many_to_cache({cache_keys[i]: embeddings[i] for i in missing})
+
+        return embeddings
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several query texts without blocking the event loop"""
+        cache_keys = [self._get_cache_key(text) for text in texts]
+        embeddings = await self._aget_many_from_cache(cache_keys)
+
+        missing = [i for i, embedding in enumerate(embeddings) if not embedding]
+        if missing:
+            vectors = await asyncio.to_thread(self.encode, [texts[i] for i in missing])
+            for i, vector in zip(missing, vectors):
+                embeddings[i] = vector.tolist()
+            await self._asave_many_to_cache(
+                {cache_keys[i]: embeddings[i] for i in missing}
+            )
+
+        return embeddings
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a query text, batching concurrent calls into one encode"""
+        cache_key = self._get_cache_key(text)
+
+        # Try cache first
+        cached_embedding = (await self._aget_many_from_cache([cache_key]))[0]
+        if cached_embedding:
+            return cached_embedding
+
+        # Generate new embedding together with other in-flight queries
+        embedding = await self.batcher.submit(text)
+
+        # Cache for future use
+        await self._asave_many_to_cache({cache_key: embedding})
+
+        return embedding
@@ -1,6 +1,6 @@
 """Law code mapping for Azerbaijan legal documents"""
 
-from typing import Dict
+from typing import Dict, Set
 
 
 class LawCodeMapper:
@@ -104,6 +104,11 @@ class LawCodeMapper:
         },
     }
 
+    @classmethod
+    def known_codes(cls) -> Set[str]:
+        """Every law code a chunk can be tagged with"""
+        return {info["code"] for info in cls.LAW_CODES.values()} | {"unknown"}
+
     @classmethod
     def get_law_info(cls, filename: str) -> Dict[str, str]:
         """Get law code info from filename"""
@@ -1,17 +1,45 @@
 """LLM answer generation module"""
 
+import asyncio
 import re
-from typing import List, Dict, Generator, Optional
+import time
+from typing import (
+    List,
+    Dict,
+    Generator,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Optional,
+)
 import openai
 
+from app.core.background import spawn
+from app.core.metrics import registry
+from app.core.timing import current_timings, record
+
+TOKEN_RATE = registry.histogram(
+    "llm_tokens_per_second",
+    "Streamed completion tokens per second after the first token",
+    buckets=(5, 10, 20, 40, 60, 80, 100, 150, 200, 400),
+)
+
 
 class LLMGenerator:
     """Generate answers using OpenAI LLM"""
 
+    # Bump whenever the prompt changes so cached answers are not reused
+    prompt_version = "1"
+
     def __init__(
-        self, client: openai.OpenAI, model: str = "gpt-4", temperature: float = 0.1
+        self,
+        client: openai.OpenAI,
+        model: str = "gpt-4",
+        temperature: float = 0.1,
+        async_client: Optional[openai.AsyncOpenAI] = None,
     ):
         self.client = client
+        self.async_client = async_client
         self.model = model
         self.temperature = temperature
         self.max_context_length = 2000
@@ -68,6 +96,12 @@ Qısa və dəqiq cavab verin. Müvafiq maddələrə istinad edin."""
             "content": "Azərbaycan hüquq məsləhətçisisiniz. Qısa və dəqiq cavablar verin.",
         }
 
+    def _build_messages(self, question: str, contexts: List[Dict]) -> List[dict]:
+        """Build the chat completion messages for a question"""
+        context_text = self._prepare_context(contexts)
+        prompt = self._create_prompt(question, context_text)
+        return [self._get_system_message(), {"role": "user", "content": prompt}]
+
     def generate_answer_stream(
         self, question: str, contexts: List[Dict]
     ) -> Generator[str, None, None]:
@@ -90,7 +124,11 @@ Qısa və dəqiq cavab verin. Müvafiq maddələrə istinad edin."""
                 max_tokens=self.max_tokens,
                 stream=True,
             )
+        except Exception:
+            yield self._generate_fallback_answer(question, contexts)
+            return
 
+        try:
             for chunk in stream:
                 if chunk.choices[0].delta.content is not None:
                     yield chunk.choices[0].delta.content
@@ -98,6 +136,10 @@ Qısa və dəqiq cavab verin. Müvafiq maddələrə istinad edin."""
         except Exception:
             yield self._generate_fallback_answer(question, contexts)
 
+        finally:
+            # Closing the response stops generation if the consumer went away
+            stream.close()
+
     def generate_answer(self, question: str, contexts: List[Dict]) -> str:
         """Generate answer using OpenAI LLM"""
         if not contexts:
@@ -122,6 +164,120 @@ Qısa və dəqiq cavab verin. Müvafiq maddələrə istinad edin."""
         except Exception:
             return self._generate_fallback_answer(question, contexts)
 
+    async def agenerate_answer_stream(
+        self,
+        question: str,
+        contexts: List[Dict],
+        on_complete: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> AsyncGenerator[str, None]:
+        """Generate answer with streaming using the async OpenAI client
+
+        ``on_complete`` is run in the background with the full answer once
+        the model has finished streaming, so writing it never delays the end
+        of the stream; it is not called for fallback answers. Closing
+        or cancelling the generator closes the upstream HTTP stream.
+        """
+        if not contexts:
+            yield "Bu sual üçün uyğun məlumat tapılmadı."
+            return
+
+        started = time.perf_counter()
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(question, contexts),
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=True,
+            )
+        except Exception:
+            yield self._generate_fallback_answer(question, contexts)
+            return
+
+        parts = []
+        first_token_at = None
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        record("llm_ttft", first_token_at - started)
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            yield self._generate_fallback_answer(question, contexts)
+            return
+
+        finally:
+            await self._aclose_stream(stream)
+
+        self._record_throughput(started, first_token_at, len(parts))
+
+        if on_complete is not None:
+            spawn(on_complete("".join(parts)))
+
+    async def agenerate_answer(
+        self,
+        question: str,
+        contexts: List[Dict],
+        on_complete: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> str:
+        """Generate answer using the async OpenAI client"""
+        if not contexts:
+            return "Bu sual üçün uyğun məlumat tapılmadı."
+
+        started = time.perf_counter()
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(question, contexts),
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=False,
+            )
+            answer = response.choices[0].message.content
+
+        except Exception:
+            return self._generate_fallback_answer(question, contexts)
+
+        record("generate", time.perf_counter() - started)
+        usage = getattr(response, "usage", None)
+        timings = current_timings()
+        if usage is not None and timings is not None:
+            timings.count("tokens", usage.completion_tokens)
+
+        if on_complete is not None:
+            await on_complete(answer)
+        return answer
+
+    @staticmethod
+    async def _aclose_stream(stream) -> None:
+        """Close an upstream stream, even from a cancelled task"""
+        try:
+            # Shielded so the close still completes when we are being cancelled
+            await asyncio.shield(stream.close())
+        except Exception:
+            pass
+
+    @staticmethod
+    def _record_throughput(
+        started: float, first_token_at: Optional[float], tokens: int
+    ) -> None:
+        """Record generation time and token throughput of a finished stream"""
+        finished = time.perf_counter()
+        record("generate", finished - started)
+
+        timings = current_timings()
+        if timings is not None:
+            timings.count("tokens", tokens)
+
+        # Each streamed chunk carries about one token
+        if first_token_at is not None and tokens > 1 and finished > first_token_at:
+            tokens_per_second = (tokens - 1) / (finished - first_token_at)
+            TOKEN_RATE.observe(tokens_per_second)
+            if timings is not None:
+                timings.counters["tokens_per_second"] = round(tokens_per_second, 1)
+
     def _generate_fallback_answer(self, question: str, contexts: List[Dict]) -> str:
         """Generate answer without LLM (fallback)"""
         if not contexts:
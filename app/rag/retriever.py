@@ -1,6 +1,8 @@
 """Retriever module for semantic search in legal documents"""
 
-from typing import List
+import asyncio
+import inspect
+from typing import Any, Dict, List, Optional
 from langchain.schema import Document
 
 
@@ -11,26 +13,104 @@ class SemanticRetriever:
         self.collection = collection
         self.embeddings = embeddings
 
-    def search(self, query: str, k: int = 5) -> List[Document]:
+    def search(
+        self, query: str, k: int = 5, where: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
         """Perform semantic search"""
         # Generate query embedding
         query_embedding = self.embeddings.embed_query(query)
 
         # Search in vector database
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=k,
-            include=["documents", "metadatas", "distances"],
+        results = self.collection.query(**self._query_kwargs(query_embedding, k, where))
+
+        return self._to_documents(results)
+
+    async def asearch(
+        self, query: str, k: int = 5, where: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Perform semantic search without blocking the event loop"""
+        # Concurrent queries are batched into one model call off the loop
+        query_embedding = await self.embeddings.aembed_query(query)
+
+        return await self.asearch_by_embedding(query_embedding, k=k, where=where)
+
+    async def asearch_by_embedding(
+        self,
+        query_embedding: List[float],
+        k: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        """Perform semantic search for a precomputed query embedding"""
+        results = await self._aquery_collection(
+            **self._query_kwargs(query_embedding, k, where)
         )
 
-        # Convert to Document objects
+        return self._to_documents(results)
+
+    async def asearch_many_by_embedding(
+        self,
+        query_embeddings: List[List[float]],
+        k: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Document]]:
+        """Search for several query embeddings in a single collection query"""
+        kwargs = self._query_kwargs(query_embeddings[0], k, where)
+        kwargs["query_embeddings"] = query_embeddings
+        results = await self._aquery_collection(**kwargs)
+
+        return [
+            self._to_documents(results, row) for row in range(len(query_embeddings))
+        ]
+
+    async def _aquery_collection(self, **kwargs) -> Dict[str, Any]:
+        """Query the collection natively async when supported, else in a thread"""
+        if inspect.iscoroutinefunction(self.collection.query):
+            return await self.collection.query(**kwargs)
+        return await asyncio.to_thread(self.collection.query, **kwargs)
+
+    @staticmethod
+    def build_where(**filters: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        """Build a metadata where clause from field -> allowed values filters"""
+        conditions = []
+        for field, values in filters.items():
+            if not values:
+                continue
+            if len(values) == 1:
+                conditions.append({field: values[0]})
+            else:
+                conditions.append({field: {"$in": list(values)}})
+
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+
+    @staticmethod
+    def _query_kwargs(
+        query_embedding: List[float], k: int, where: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Build collection query arguments"""
+        kwargs = {
+            "query_embeddings": [query_embedding],
+            "n_results": k,
+            "include": ["documents", "metadatas", "distances"],
+        }
+        if where:
+            kwargs["where"] = where
+        return kwargs
+
+    @staticmethod
+    def _to_documents(results: Dict[str, Any], row: int = 0) -> List[Document]:
+        """Convert one query's collection results to Document objects"""
         documents = []
-        for i, doc in enumerate(results["documents"][0]):
-            metadata = results["metadatas"][0][i]
-            distance = results["distances"][0][i]
+        for i, doc in enumerate(results["documents"][row]):
+            metadata = results["metadatas"][row][i]
+            distance = results["distances"][row][i]
 
-            # Add relevance score
+            # Add relevance score and chunk identity
             metadata["relevance_score"] = 1 - distance
+            metadata["chunk_id"] = results["ids"][row][i]
 
             documents.append(Document(page_content=doc, metadata=metadata))
 
@@ -0,0 +1,140 @@
+"""In-process semantic cache for near-duplicate questions"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.metrics import registry
+
+SEMANTIC_CACHE_REQUESTS = registry.counter(
+    "semantic_cache_requests_total", "Semantic cache lookups by result", ["result"]
+)
+SEMANTIC_CACHE_ENTRIES = registry.gauge(
+    "semantic_cache_entries", "Answers currently held in the semantic cache"
+)
+SEMANTIC_CACHE_INVALIDATIONS = registry.counter(
+    "semantic_cache_invalidations_total",
+    "Semantic cache entries dropped by law code invalidation",
+    ["law_code"],
+)
+
+
+class SemanticCache:
+    """Cache answers by question embedding and match paraphrases by cosine
+
+    Question embeddings are kept L2-normalized in a fixed-size matrix used as
+    a ring buffer, so a lookup is a single matrix-vector product. Each entry
+    remembers the law codes of its sources, and their generations when it
+    was retrieved, for targeted invalidation.
+    """
+
+    def __init__(
+        self, threshold: float = 0.97, max_entries: int = 1000, ttl: int = 3600
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._vectors: Optional[np.ndarray] = None
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._ks = np.zeros(max_entries, dtype=np.int32)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._next_slot = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: List[float], k: int) -> Optional[Dict[str, Any]]:
+        """Return the cached entry most similar to a question, if close enough
+
+        Only misses are counted here. The caller counts a returned entry with
+        ``record_hit`` once it has checked the entry is not stale, or with
+        ``discard`` if it is.
+        """
+        if self._vectors is None:
+            SEMANTIC_CACHE_REQUESTS.inc(result="miss")
+            return None
+
+        scores = self._vectors @ self._normalize(embedding)
+        live = (self._expires > time.time()) & (self._ks == k)
+        scores = np.where(live, scores, -1.0)
+
+        slot = int(np.argmax(scores))
+        if scores[slot] < self.threshold:
+            SEMANTIC_CACHE_REQUESTS.inc(result="miss")
+            return None
+
+        return self._entries[slot]
+
+    @staticmethod
+    def record_hit() -> None:
+        """Count an entry served after passing the staleness check"""
+        SEMANTIC_CACHE_REQUESTS.inc(result="hit")
+
+    @staticmethod
+    def record_miss() -> None:
+        """Count an entry that could not be checked, so was not served"""
+        SEMANTIC_CACHE_REQUESTS.inc(result="miss")
+
+    def add(
+        self,
+        embedding: List[float],
+        k: int,
+        answer: str,
+        results: Dict[str, Any],
+        generations: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Remember an answer and the search results it was generated from"""
+        vector = self._normalize(embedding)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), np.float32)
+
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.max_entries
+
+        self._vectors[slot] = vector
+        self._expires[slot] = time.time() + self.ttl
+        self._ks[slot] = k
+        self._entries[slot] = {
+            "answer": answer,
+            "results": results,
+            "law_codes": {ctx.get("law_code") for ctx in results["contexts"]},
+            "generations": generations or {},
+        }
+        SEMANTIC_CACHE_ENTRIES.set(len(self))
+
+    def discard(self, entry: Dict[str, Any]) -> None:
+        """Drop an entry found to be stale"""
+        for slot, cached in enumerate(self._entries):
+            if cached is entry:
+                self._drop(slot)
+        SEMANTIC_CACHE_REQUESTS.inc(result="stale")
+        SEMANTIC_CACHE_ENTRIES.set(len(self))
+
+    def invalidate_law_code(self, law_code: str) -> int:
+        """Drop every entry whose sources cite the given law code"""
+        dropped = 0
+        for slot, entry in enumerate(self._entries):
+            if entry is not None and law_code in entry["law_codes"]:
+                self._drop(slot)
+                dropped += 1
+
+        SEMANTIC_CACHE_INVALIDATIONS.inc(dropped, law_code=law_code)
+        SEMANTIC_CACHE_ENTRIES.set(len(self))
+        return dropped
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        for slot in range(self.max_entries):
+            self._drop(slot)
+        SEMANTIC_CACHE_ENTRIES.set(0)
+
+    def _drop(self, slot: int) -> None:
+        self._entries[slot] = None
+        self._expires[slot] = 0.0
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._expires > time.time()))
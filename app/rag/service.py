@@ -1,24 +1,65 @@
 """Main RAG service for Azerbaijan Legal System"""
 
-from typing import Dict, Any, List
+import asyncio
+import threading
+import time
+from typing import (
+    Dict,
+    Any,
+    List,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Optional,
+    Tuple,
+)
 import chromadb
 import openai
+from langchain.schema import Document
 
+from app.core.admission import (
+    AdmittedStream,
+    OverloadedError,
+    get_admission_controller,
+)
 from app.core.config import settings
+from app.core.timing import note, track
+from app.rag.answer_cache import AnswerCache
+from app.rag.cache_invalidation import LawCodeGenerations
 from app.rag.chunking import LegalChunker
+from app.rag.coalescing import StreamCoalescer
 from app.rag.embeddings import HuggingFaceEmbedding
+from app.rag.embedding_server import RemoteEmbedding
 from app.rag.law_mapper import LawCodeMapper
 from app.rag.pdf_extractor import PDFExtractor
 from app.rag.retriever import SemanticRetriever
+from app.rag.semantic_cache import SemanticCache
 from app.rag.llm_generator import LLMGenerator
+from app.rag.text_processing import TextNormalizer
+from app.services.redis_service import get_redis_service
 
 
 class AzerbaijanLegalRAG:
     """Complete RAG system for all Azerbaijan Law Codes"""
 
-    def __init__(self):
-        # Initialize OpenAI client
-        self.llm_client = openai.OpenAI(api_key=settings.openai_api_key)
+    def __init__(
+        self,
+        chroma_client: Optional[Any] = None,
+        embeddings: Optional[HuggingFaceEmbedding] = None,
+    ):
+        """Build the RAG system
+
+        ``chroma_client`` and ``embeddings`` replace the Chroma Cloud client
+        and the embedding model, e.g. with local stand-ins for benchmarks.
+        """
+        # Initialize OpenAI clients
+        self.llm_client = openai.OpenAI(
+            api_key=settings.openai_api_key, base_url=settings.openai_base_url
+        )
+        self.async_llm_client = openai.AsyncOpenAI(
+            api_key=settings.openai_api_key, base_url=settings.openai_base_url
+        )
 
         # Initialize components
         self.chunker = LegalChunker(
@@ -30,23 +71,63 @@ class AzerbaijanLegalRAG:
             client=self.llm_client,
             model=settings.llm_model,
             temperature=settings.llm_temperature,
+            async_client=self.async_llm_client,
+        )
+
+        # Per-stage concurrency limits and load shedding
+        self.admission = get_admission_controller()
+
+        # Identical in-flight streaming questions share one pipeline run
+        self.stream_coalescer = StreamCoalescer()
+
+        # Answer cache, bound to the shared Redis connection on first use
+        self.answer_cache: Optional[AnswerCache] = None
+
+        # Law code generations that invalidate cached answers in every worker
+        self.law_generations: Optional[LawCodeGenerations] = None
+
+        # Local index of answered questions for near-duplicate matches
+        self.semantic_cache = (
+            SemanticCache(
+                threshold=settings.semantic_cache_threshold,
+                max_entries=settings.semantic_cache_max_entries,
+                ttl=settings.semantic_cache_ttl,
+            )
+            if settings.semantic_cache_enabled
+            else None
         )
 
-        # Initialize HuggingFace embeddings
-        self.embeddings = HuggingFaceEmbedding(settings.embedding_model)
+        # Seconds spent in each startup stage, reported by the warm-up
+        self.startup_timings: Dict[str, float] = {}
+
+        # Initialize HuggingFace embeddings, or share the embedding server's model
+        started = time.perf_counter()
+        if embeddings is not None:
+            self.embeddings = embeddings
+        elif settings.embedding_server_socket:
+            self.embeddings = RemoteEmbedding(
+                settings.embedding_model, settings.embedding_server_socket
+            )
+        else:
+            self.embeddings = HuggingFaceEmbedding(settings.embedding_model)
+        self.startup_timings["load_embedding_model"] = time.perf_counter() - started
 
         # Initialize Chroma Cloud client
-        self.chroma_client = chromadb.CloudClient(
+        started = time.perf_counter()
+        self.chroma_client = chroma_client or chromadb.CloudClient(
             tenant=settings.chroma_tenant_id,
             database=settings.chroma_database,
             api_key=settings.chroma_api_key,
         )
         self.collection_name = settings.chroma_collection
+        self.startup_timings["create_chroma_client"] = time.perf_counter() - started
 
         # Initialize collection
+        started = time.perf_counter()
         self.collection = None
         self.retriever = None
         self._initialize_collection()
+        self.startup_timings["get_collection"] = time.perf_counter() - started
 
     def _initialize_collection(self):
         """Initialize or get existing collection"""
@@ -67,6 +148,22 @@ class AzerbaijanLegalRAG:
         """Set up the retriever for semantic search"""
         self.retriever = SemanticRetriever(self.collection, self.embeddings)
 
+    async def warmup(self, text: str = "Maddə 1") -> Dict[str, float]:
+        """Run a dummy embedding and search so the first request is served warm"""
+        if not self.retriever:
+            raise ValueError("System not initialized. Retriever not available.")
+
+        # Encode directly so a cached embedding does not skip model warm-up
+        started = time.perf_counter()
+        embedding = await asyncio.to_thread(self.embeddings.encode, [text])
+        self.startup_timings["warmup_embed"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await self.retriever.asearch_by_embedding(embedding[0].tolist(), k=1)
+        self.startup_timings["warmup_search"] = time.perf_counter() - started
+
+        return self.startup_timings
+
     def _process_search_results(self, relevant_docs: List) -> Dict[str, Any]:
         """Process search results and extract information"""
         article_references = []
@@ -92,6 +189,7 @@ class AzerbaijanLegalRAG:
                     "law_name": law_name_az,
                     "article_ref": article_ref,
                     "relevance_score": doc.metadata.get("relevance_score", 0),
+                    "chunk_id": doc.metadata.get("chunk_id", ""),
                 }
             )
 
@@ -109,6 +207,382 @@ class AzerbaijanLegalRAG:
             "law_codes": list(law_codes_found),
         }
 
+    async def _get_answer_cache(self) -> Optional[AnswerCache]:
+        """Get the answer cache, creating it on the shared Redis client"""
+        if not settings.answer_cache_enabled:
+            return None
+
+        if self.answer_cache is None:
+            redis_service = await get_redis_service()
+            self.answer_cache = AnswerCache(
+                redis_service.redis_client,
+                ttl=settings.answer_cache_ttl,
+                max_entries=settings.answer_cache_max_entries,
+            )
+        return self.answer_cache
+
+    async def _get_law_generations(self) -> LawCodeGenerations:
+        """Get the law code generations on the shared Redis client"""
+        if self.law_generations is None:
+            redis_service = await get_redis_service()
+            self.law_generations = LawCodeGenerations(redis_service.redis_client)
+        return self.law_generations
+
+    async def _current_generations(
+        self, law_codes: Iterable[str]
+    ) -> Optional[Dict[str, int]]:
+        """Current generations of some law codes, or None if Redis can't tell"""
+        try:
+            law_generations = await self._get_law_generations()
+            return await law_generations.get(law_codes)
+        except Exception:
+            return None
+
+    async def _semantic_lookup(
+        self, query_embedding: List[float], k: int
+    ) -> Optional[Dict[str, Any]]:
+        """Find a cached answer for a near-duplicate question
+
+        A hit is only served while the laws it cites are unchanged, so an
+        invalidation in any worker reaches this worker's cache too.
+        """
+        return (await self._semantic_lookup_many([query_embedding], k))[0]
+
+    async def _semantic_lookup_many(
+        self, query_embeddings: List[List[float]], k: int
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Find cached answers for many questions with one generations read"""
+        hits = [self.semantic_cache.lookup(e, k) for e in query_embeddings]
+        if all(hit is None for hit in hits):
+            return hits
+
+        law_codes = set()
+        for hit in hits:
+            if hit is not None:
+                law_codes.update(code for code in hit["law_codes"] if code)
+
+        current = await self._current_generations(law_codes)
+
+        for i, hit in enumerate(hits):
+            if hit is None:
+                continue
+            if current is None:
+                self.semantic_cache.record_miss()
+                hits[i] = None
+                continue
+            cited = {code: current[code] for code in hit["law_codes"] if code}
+            if cited != hit["generations"]:
+                self.semantic_cache.discard(hit)
+                hits[i] = None
+            else:
+                self.semantic_cache.record_hit()
+        return hits
+
+    async def _lookup_answer(
+        self, question: str, contexts: List[Dict]
+    ) -> Tuple[Optional[str], Optional[Callable[[str], Awaitable[None]]]]:
+        """Look up a cached answer and build the callback that stores a new one"""
+        if not contexts:
+            return None, None
+
+        try:
+            cache = await self._get_answer_cache()
+        except Exception:
+            cache = None
+        if cache is None:
+            return None, None
+
+        key = cache.build_key(
+            question,
+            [ctx.get("content", "") for ctx in contexts],
+            self.llm_generator.model,
+            self.llm_generator.prompt_version,
+        )
+
+        async def store_answer(answer: str) -> None:
+            await cache.set(key, answer, [ctx.get("law_code") for ctx in contexts])
+
+        with track("answer_cache"):
+            cached_answer = await cache.get(key)
+        note("answer_cache", "hit" if cached_answer is not None else "miss")
+
+        return cached_answer, store_answer
+
+    async def _aretrieve(
+        self, question: str, k: int, deadline: Optional[float] = None
+    ) -> Tuple[
+        Dict[str, Any], Optional[str], Optional[Callable[[str], Awaitable[None]]]
+    ]:
+        """Retrieve contexts for a question and look up a cached answer
+
+        Returns the processed search results, a cached answer or None, and a
+        callback that stores a newly generated answer in the caches.
+        """
+        async with self.admission.slot("embed", deadline):
+            with track("embed"):
+                query_embedding = await self.embeddings.aembed_query(question)
+
+        # Near-duplicate questions skip both the vector store and the LLM
+        if self.semantic_cache is not None:
+            with track("semantic_cache"):
+                hit = await self._semantic_lookup(query_embedding, k)
+            note("semantic_cache", "hit" if hit is not None else "miss")
+            if hit is not None:
+                return hit["results"], hit["answer"], None
+
+        # Perform semantic search off the event loop
+        async with self.admission.slot("retrieve", deadline):
+            with track("chroma"):
+                relevant_docs = await self.retriever.asearch_by_embedding(
+                    query_embedding, k=k
+                )
+
+        return await self._finish_retrieval(question, query_embedding, k, relevant_docs)
+
+    async def _finish_retrieval(
+        self,
+        question: str,
+        query_embedding: List[float],
+        k: int,
+        relevant_docs: List[Document],
+    ) -> Tuple[
+        Dict[str, Any], Optional[str], Optional[Callable[[str], Awaitable[None]]]
+    ]:
+        """Process search results and look up a cached answer for them"""
+        # Process results
+        results = self._process_search_results(relevant_docs)
+
+        # Look up an answer for the same question and chunk set, and note the
+        # generations of the laws it cites to detect a later invalidation
+        law_codes = {ctx.get("law_code") for ctx in results["contexts"]}
+        (cached_answer, store_answer), generations = await asyncio.gather(
+            self._lookup_answer(question, results["contexts"]),
+            self._current_generations(law_codes),
+        )
+        if not results["contexts"] or generations is None:
+            return results, cached_answer, store_answer
+
+        async def remember_answer(answer: str) -> None:
+            # A law invalidated while the answer was generated keeps it uncached
+            if await self._current_generations(law_codes) != generations:
+                return
+            if self.semantic_cache is not None:
+                self.semantic_cache.add(
+                    query_embedding, k, answer, results, generations
+                )
+            if store_answer is not None:
+                await store_answer(answer)
+
+        if cached_answer is not None and self.semantic_cache is not None:
+            self.semantic_cache.add(
+                query_embedding, k, cached_answer, results, generations
+            )
+
+        return results, cached_answer, remember_answer
+
+    async def aprepare_batch(
+        self, questions: List[str], k: int = 5, deadline: Optional[float] = None
+    ) -> List[
+        Tuple[Dict[str, Any], Optional[str], Optional[Callable[[str], Awaitable[None]]]]
+    ]:
+        """Embed and retrieve a batch of questions before any answer is generated
+
+        All questions are embedded in one model call and searched with one
+        multi-embedding collection query. Returns the processed search
+        results, cached answer and store callback of each question. Raises
+        OverloadedError when a stage cannot admit the batch before
+        ``deadline`` (a ``time.monotonic()`` value).
+        """
+        if not self.retriever:
+            raise ValueError("System not initialized. Retriever not available.")
+
+        if deadline is None:
+            deadline = self.admission.deadline()
+
+        async with self.admission.slot("embed", deadline):
+            with track("embed"):
+                query_embeddings = await self.embeddings.aembed_queries(questions)
+
+        # Near-duplicate questions skip the vector store and the LLM
+        prepared: List[Optional[Tuple]] = [None] * len(questions)
+        if self.semantic_cache is not None:
+            hits = await self._semantic_lookup_many(query_embeddings, k)
+            for i, hit in enumerate(hits):
+                if hit is not None:
+                    prepared[i] = (hit["results"], hit["answer"], None)
+
+        # One vector store round trip for every remaining question
+        pending = [i for i, item in enumerate(prepared) if item is None]
+        if pending:
+            async with self.admission.slot("retrieve", deadline):
+                with track("chroma"):
+                    docs_per_question = await self.retriever.asearch_many_by_embedding(
+                        [query_embeddings[i] for i in pending], k=k
+                    )
+            finished = await asyncio.gather(
+                *[
+                    self._finish_retrieval(
+                        questions[i], query_embeddings[i], k, relevant_docs
+                    )
+                    for i, relevant_docs in zip(pending, docs_per_question)
+                ]
+            )
+            for i, item in zip(pending, finished):
+                prepared[i] = item
+
+        # Reject early if the LLM stage is already saturated
+        if any(answer is None for _, answer, _ in prepared):
+            self.admission.check("generate", deadline)
+
+        return prepared
+
+    async def aanswer_batch(
+        self,
+        questions: List[str],
+        prepared: List[Tuple],
+        concurrency: int = 8,
+    ) -> AsyncGenerator[Tuple[int, Dict[str, Any]], None]:
+        """Answer a prepared batch, yielding (index, result) as each completes
+
+        LLM calls run with at most ``concurrency`` in flight for the batch,
+        and each one also holds a slot of the shared generate stage. Each
+        call gets its own admission deadline once it is next in the batch,
+        so a long batch is not rejected for the time spent on earlier items.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def answer(i: int) -> Tuple[int, Dict[str, Any]]:
+            question = questions[i]
+            results, answer, store_answer = prepared[i]
+            try:
+                cached = answer is not None
+                if not cached:
+                    async with semaphore:
+                        deadline = self.admission.deadline()
+                        async with self.admission.slot("generate", deadline):
+                            answer = await self.llm_generator.agenerate_answer(
+                                question,
+                                results["contexts"],
+                                on_complete=store_answer,
+                            )
+
+                return i, {
+                    "question": question,
+                    "answer": answer,
+                    "references": results["references"],
+                    "law_codes": results["law_codes"],
+                    "sources": results["contexts"],
+                    "total_sources": len(results["contexts"]),
+                    "cached": cached,
+                }
+
+            except Exception as e:
+                return i, self._error_result(question, e)
+
+        tasks = [asyncio.create_task(answer(i)) for i in range(len(questions))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def query_batch(
+        self,
+        questions: List[str],
+        k: int = 5,
+        concurrency: int = 8,
+        deadline: Optional[float] = None,
+    ) -> AsyncGenerator[Tuple[int, Dict[str, Any]], None]:
+        """Answer many questions, yielding (index, result) as each completes
+
+        Raises OverloadedError when the embed or retrieve stage cannot admit
+        the batch before ``deadline`` (a ``time.monotonic()`` value).
+        """
+        try:
+            prepared = await self.aprepare_batch(questions, k, deadline)
+
+        except OverloadedError:
+            raise
+
+        except Exception as e:
+            for i, question in enumerate(questions):
+                yield i, self._error_result(question, e)
+            return
+
+        async for item in self.aanswer_batch(questions, prepared, concurrency):
+            yield item
+
+    async def asearch(
+        self,
+        question: str,
+        k: int = 5,
+        offset: int = 0,
+        law_code: Optional[List[str]] = None,
+        chunk_type: Optional[List[str]] = None,
+        deadline: Optional[float] = None,
+    ) -> List[Document]:
+        """Return one page of ranked chunks without generating an answer"""
+        if not self.retriever:
+            raise ValueError("System not initialized. Retriever not available.")
+
+        if deadline is None:
+            deadline = self.admission.deadline()
+
+        where = self.retriever.build_where(law_code=law_code, chunk_type=chunk_type)
+
+        async with self.admission.slot("embed", deadline):
+            with track("embed"):
+                query_embedding = await self.embeddings.aembed_query(question)
+
+        # The vector store has no offset, so fetch up to the end of the page
+        async with self.admission.slot("retrieve", deadline):
+            with track("chroma"):
+                documents = await self.retriever.asearch_by_embedding(
+                    query_embedding, k=offset + k, where=where
+                )
+        return documents[offset:]
+
+    async def invalidate_law_code(self, law_code: str) -> Dict[str, int]:
+        """Invalidate cached answers that cite a law code, in every worker
+
+        Bumping the law code's generation makes other workers discard their
+        semantic cache entries citing it on the next hit. This worker's
+        entries and the Redis answer cache entries are deleted right away.
+        Returns how many entries were dropped from each cache.
+        """
+        law_generations = await self._get_law_generations()
+        await law_generations.bump(law_code)
+
+        dropped = {"semantic_cache": 0, "answer_cache": 0}
+        if self.semantic_cache is not None:
+            dropped["semantic_cache"] = self.semantic_cache.invalidate_law_code(
+                law_code
+            )
+
+        answer_cache = await self._get_answer_cache()
+        if answer_cache is not None:
+            dropped["answer_cache"] = await answer_cache.invalidate_law_code(law_code)
+        return dropped
+
+    @staticmethod
+    async def _replay_answer(answer: str) -> AsyncGenerator[str, None]:
+        """Stream a cached answer"""
+        yield answer
+
+    @staticmethod
+    def _error_result(question: str, error: Exception) -> Dict[str, Any]:
+        """Build the result returned when a query fails"""
+        return {
+            "question": question,
+            "answer": f"Sorğu zamanı xəta baş verdi: {str(error)}",
+            "references": "",
+            "law_codes": [],
+            "sources": [],
+            "total_sources": 0,
+            "error": str(error),
+        }
+
     def query_stream(self, question: str, k: int = 5) -> Dict[str, Any]:
         """Query the legal system with streaming response"""
         if not self.retriever:
@@ -116,7 +590,8 @@ class AzerbaijanLegalRAG:
 
         try:
             # Perform semantic search
-            relevant_docs = self.retriever.search(question, k=k)
+            with track("retrieve"):
+                relevant_docs = self.retriever.search(question, k=k)
 
             # Process results
             results = self._process_search_results(relevant_docs)
@@ -134,15 +609,7 @@ class AzerbaijanLegalRAG:
             }
 
         except Exception as e:
-            return {
-                "question": question,
-                "answer": f"Sorğu zamanı xəta baş verdi: {str(e)}",
-                "references": "",
-                "law_codes": [],
-                "sources": [],
-                "total_sources": 0,
-                "error": str(e),
-            }
+            return self._error_result(question, e)
 
     def query(self, question: str, k: int = 5) -> Dict[str, Any]:
         """Query the legal system"""
@@ -151,13 +618,17 @@ class AzerbaijanLegalRAG:
 
         try:
             # Perform semantic search
-            relevant_docs = self.retriever.search(question, k=k)
+            with track("retrieve"):
+                relevant_docs = self.retriever.search(question, k=k)
 
             # Process results
             results = self._process_search_results(relevant_docs)
 
             # Generate answer using LLM
-            answer = self.llm_generator.generate_answer(question, results["contexts"])
+            with track("generate"):
+                answer = self.llm_generator.generate_answer(
+                    question, results["contexts"]
+                )
 
             return {
                 "question": question,
@@ -169,24 +640,129 @@ class AzerbaijanLegalRAG:
             }
 
         except Exception as e:
+            return self._error_result(question, e)
+
+    async def aquery_stream(
+        self, question: str, k: int = 5, deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Query the legal system with an async streaming response
+
+        Raises OverloadedError when a pipeline stage cannot admit the request
+        before ``deadline`` (a ``time.monotonic()`` value).
+        """
+        if not self.retriever:
+            raise ValueError("System not initialized. Retriever not available.")
+
+        if deadline is None:
+            deadline = self.admission.deadline()
+
+        if not settings.coalesce_inflight_queries:
+            return await self._aquery_stream(question, k, deadline)
+
+        # Identical questions asked concurrently share one answer stream
+        key = (TextNormalizer.normalize_question(question), k)
+        result = await self.stream_coalescer.run(
+            key, lambda: self._aquery_stream(question, k, deadline)
+        )
+        result["question"] = question
+        return result
+
+    async def _aquery_stream(
+        self, question: str, k: int, deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Run retrieval and start the answer stream for a question"""
+        try:
+            results, cached_answer, store_answer = await self._aretrieve(
+                question, k, deadline
+            )
+
+            # Replay a cached answer, otherwise stream a new one from the LLM
+            if cached_answer is not None:
+                answer_stream = self._replay_answer(cached_answer)
+            else:
+                # Take the generate slot before the response starts, so an
+                # overloaded stage answers 429 instead of failing mid-stream
+                release = await self.admission.hold("generate", deadline)
+                answer_stream = AdmittedStream(
+                    self.llm_generator.agenerate_answer_stream(
+                        question, results["contexts"], on_complete=store_answer
+                    ),
+                    release,
+                )
+
+            # Return metadata immediately, stream will contain the answer
             return {
                 "question": question,
-                "answer": f"Sorğu zamanı xəta baş verdi: {str(e)}",
-                "references": "",
-                "law_codes": [],
-                "sources": [],
-                "total_sources": 0,
-                "error": str(e),
+                "answer_stream": answer_stream,
+                "references": results["references"],
+                "law_codes": results["law_codes"],
+                "sources": results["contexts"],
+                "total_sources": len(results["contexts"]),
+                "cached": cached_answer is not None,
             }
 
+        except OverloadedError:
+            raise
+
+        except Exception as e:
+            return self._error_result(question, e)
+
+    async def aquery(
+        self, question: str, k: int = 5, deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Query the legal system without blocking the event loop
+
+        Raises OverloadedError when a pipeline stage cannot admit the request
+        before ``deadline`` (a ``time.monotonic()`` value).
+        """
+        if not self.retriever:
+            raise ValueError("System not initialized. Retriever not available.")
+
+        if deadline is None:
+            deadline = self.admission.deadline()
+
+        try:
+            results, answer, store_answer = await self._aretrieve(question, k, deadline)
+
+            # Reuse a cached answer or generate one with the async LLM client
+            cached = answer is not None
+            if not cached:
+                async with self.admission.slot("generate", deadline):
+                    answer = await self.llm_generator.agenerate_answer(
+                        question, results["contexts"], on_complete=store_answer
+                    )
+
+            return {
+                "question": question,
+                "answer": answer,
+                "references": results["references"],
+                "law_codes": results["law_codes"],
+                "sources": results["contexts"],
+                "total_sources": len(results["contexts"]),
+                "cached": cached,
+            }
+
+        except OverloadedError:
+            raise
+
+        except Exception as e:
+            return self._error_result(question, e)
+
 
 # Create a singleton instance
 _rag_instance = None
+_rag_instance_lock = threading.Lock()
 
 
 def get_rag_service() -> AzerbaijanLegalRAG:
-    """Get or create RAG service instance"""
+    """Get or create RAG service instance
+
+    The warm-up thread and the first requests may ask for it at the same
+    time, so only one of them builds it and the others wait.
+    """
     global _rag_instance
     if _rag_instance is None:
-        _rag_instance = AzerbaijanLegalRAG()
+        with _rag_instance_lock:
+            if _rag_instance is None:
+                _rag_instance = AzerbaijanLegalRAG()
     return _rag_instance
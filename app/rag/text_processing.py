@@ -97,3 +97,8 @@ class TextNormalizer:
         text = text.strip()
 
         return text, is_valid
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """Normalize a user question for use as a cache or coalescing key"""
+        return " ".join(question.casefold().split())
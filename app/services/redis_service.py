@@ -2,27 +2,41 @@
 
 import json
 import asyncio
-from typing import Optional, List, Dict, Any
+import time
+import uuid
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import redis.asyncio as redis
+from pydantic import ValidationError
 from redis.asyncio import Redis
 
 from app.core.config import settings
+from app.core.timing import timed
 from app.models.chat import ChatSession, ChatMessage, MessageRole
+from app.services.serializers import SessionSerializer, get_serializer
 
 
 class RedisService:
     """Service for managing chat sessions in Redis"""
 
-    def __init__(self):
+    def __init__(self, serializer: Optional[SessionSerializer] = None):
         self.redis_client: Optional[Redis] = None
+        # Returns raw bytes, for reading binary-encoded records
+        self.binary_client: Optional[Redis] = None
         self.session_prefix = "session:"
         self.user_sessions_prefix = "user_sessions:"
+        # Session IDs scored by when they expire
+        self.active_sessions_key = "sessions:active"
+        self.serializer = serializer or get_serializer(
+            settings.session_serializer, settings.session_compress_min_bytes
+        )
 
     async def connect(self):
         """Connect to Redis"""
         redis_kwargs = self._build_redis_kwargs()
         self.redis_client = await redis.from_url(settings.redis_url, **redis_kwargs)
+        redis_kwargs["decode_responses"] = False
+        self.binary_client = await redis.from_url(settings.redis_url, **redis_kwargs)
 
     def _build_redis_kwargs(self) -> dict:
         """Build Redis connection kwargs based on settings"""
@@ -39,37 +53,190 @@ class RedisService:
         """Disconnect from Redis"""
         if self.redis_client:
             await self.redis_client.close()
+        if self.binary_client:
+            await self.binary_client.close()
+
+    def _meta_key(self, session_id: str) -> str:
+        """Hash with the session's own fields"""
+        return f"{self.session_prefix}{session_id}:meta"
+
+    def _messages_key(self, session_id: str) -> str:
+        """List of the session's messages, oldest first"""
+        return f"{self.session_prefix}{session_id}:messages"
+
+    def _sources_key(self, session_id: str) -> str:
+        """Hash of the sources cited by the session's answers"""
+        return f"{self.session_prefix}{session_id}:sources"
+
+    def _legacy_key(self, session_id: str) -> str:
+        """Single JSON blob used by the old session format"""
+        return f"{self.session_prefix}{session_id}"
+
+    def _session_keys(self, session_id: str) -> List[str]:
+        """Every key a session may be stored under"""
+        return [
+            self._meta_key(session_id),
+            self._messages_key(session_id),
+            self._sources_key(session_id),
+            self._legacy_key(session_id),
+        ]
+
+    def _track_active(self, pipe, session_id: str, ttl: Optional[int] = None):
+        """Queue an update of the session's expiry in the active-session index
+
+        Entries whose sessions expired by TTL are pruned at the same time, so
+        the index stays bounded by the sessions alive now.
+        """
+        now = time.time()
+        pipe.zadd(
+            self.active_sessions_key, {session_id: now + (ttl or settings.session_ttl)}
+        )
+        pipe.zremrangebyscore(self.active_sessions_key, "-inf", now)
+
+    @staticmethod
+    def _encode_meta(session: ChatSession) -> Dict[str, str]:
+        """Flatten session fields into hash fields"""
+        meta = {
+            "session_id": session.session_id,
+            "created_at": session.created_at.isoformat(),
+            "last_activity": session.last_activity.isoformat(),
+            "metadata": json.dumps(session.metadata, default=str),
+        }
+        if session.user_id:
+            meta["user_id"] = session.user_id
+        if session.summary:
+            meta["summary"] = json.dumps(session.summary, default=str)
+        return meta
+
+    @staticmethod
+    def _decode_session(meta: Dict[bytes, bytes]) -> Optional[ChatSession]:
+        """Rebuild a session, without its messages, from its hash fields"""
+        if not meta:
+            return None
+
+        meta = {key.decode(): value.decode() for key, value in meta.items()}
+
+        return ChatSession(
+            session_id=meta["session_id"],
+            user_id=meta.get("user_id"),
+            created_at=meta.get("created_at") or datetime.utcnow(),
+            last_activity=meta.get("last_activity") or datetime.utcnow(),
+            metadata=json.loads(meta.get("metadata") or "{}"),
+            summary=json.loads(meta["summary"]) if meta.get("summary") else None,
+        )
+
+    @staticmethod
+    def _message_to_dict(message: ChatMessage) -> Dict[str, Any]:
+        return {
+            "role": message.role.value,
+            "content": message.content,
+            "timestamp": message.timestamp.isoformat(),
+            "metadata": message.metadata,
+        }
+
+    @staticmethod
+    def _message_from_dict(data: Dict[str, Any]) -> ChatMessage:
+        """Build a message without validation, since we wrote the record"""
+        return ChatMessage.model_construct(
+            role=MessageRole(data["role"]),
+            content=data["content"],
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            metadata=data.get("metadata"),
+        )
+
+    def _encode_messages(
+        self, messages: List[ChatMessage]
+    ) -> Tuple[List[bytes], Dict[str, bytes]]:
+        """Encode messages, moving bulky sources out to their own hash
+
+        Each message with sources gets a ``sources_ref`` in its metadata that
+        points at its entry in the returned mapping.
+        """
+        encoded = []
+        sources = {}
+        for message in messages:
+            data = self._message_to_dict(message)
+            if message.metadata and message.metadata.get("sources"):
+                ref = uuid.uuid4().hex[:16]
+                metadata = dict(message.metadata)
+                sources[ref] = self.serializer.dumps(metadata.pop("sources"))
+                metadata["sources_ref"] = ref
+                data["metadata"] = metadata
+            encoded.append(self.serializer.dumps(data))
+        return encoded, sources
+
+    def _decode_messages(
+        self, encoded: List[bytes], sources: Optional[Dict[bytes, bytes]] = None
+    ) -> List[ChatMessage]:
+        """Decode messages, restoring their sources when ``sources`` is given"""
+        messages = [self._message_from_dict(self.serializer.loads(m)) for m in encoded]
+        for message in messages:
+            if not message.metadata:
+                continue
+            ref = message.metadata.pop("sources_ref", None)
+            if sources is None:
+                # Sessions migrated from the blob format still have them inline
+                message.metadata.pop("sources", None)
+            elif ref is not None:
+                data = sources.get(ref.encode())
+                message.metadata["sources"] = (
+                    self.serializer.loads(data) if data else []
+                )
+        return messages
+
+    async def _read_session(self, session_id: str) -> list:
+        """Read a session's keys and whether an old-format blob exists"""
+        async with self.binary_client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._meta_key(session_id))
+            pipe.lrange(self._messages_key(session_id), 0, -1)
+            pipe.hgetall(self._sources_key(session_id))
+            pipe.exists(self._legacy_key(session_id))
+            return await pipe.execute()
 
+    @timed("redis_get_session")
     async def get_session(self, session_id: str) -> Optional[ChatSession]:
         """Get a chat session by ID"""
-        key = f"{self.session_prefix}{session_id}"
-        data = await self.redis_client.get(key)
+        meta, messages, sources, legacy = await self._read_session(session_id)
 
-        if data:
-            session_data = json.loads(data)
-            return ChatSession(**session_data)
-        return None
+        if legacy:
+            # Read once more after migrating; a blob left behind is ignored
+            await self.migrate_legacy_session(session_id)
+            meta, messages, sources, _ = await self._read_session(session_id)
 
+        session = self._decode_session(meta)
+        if session:
+            session.messages = self._decode_messages(messages, sources)
+        return session
+
+    @timed("redis_save_session")
     async def save_session(self, session: ChatSession) -> bool:
-        """Save or update a chat session"""
-        key = f"{self.session_prefix}{session.session_id}"
+        """Save or replace a chat session with all of its messages"""
+        meta_key = self._meta_key(session.session_id)
+        messages_key = self._messages_key(session.session_id)
+        sources_key = self._sources_key(session.session_id)
 
         # Update last activity
         session.last_activity = datetime.utcnow()
-
-        # Convert to JSON
-        session_data = session.model_dump(mode="json")
-
-        # Save with TTL
-        await self.redis_client.setex(
-            key, settings.session_ttl, json.dumps(session_data, default=str)
-        )
-
-        # Also track session for user if user_id is provided
-        if session.user_id:
-            user_key = f"{self.user_sessions_prefix}{session.user_id}"
-            await self.redis_client.sadd(user_key, session.session_id)
-            await self.redis_client.expire(user_key, settings.session_ttl)
+        encoded, sources = self._encode_messages(session.messages)
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(meta_key, messages_key, sources_key)
+            pipe.hset(meta_key, mapping=self._encode_meta(session))
+            if encoded:
+                pipe.rpush(messages_key, *encoded)
+            if sources:
+                pipe.hset(sources_key, mapping=sources)
+            for key in (meta_key, messages_key, sources_key):
+                pipe.expire(key, settings.session_ttl)
+            self._track_active(pipe, session.session_id)
+
+            # Also track session for user if user_id is provided
+            if session.user_id:
+                user_key = f"{self.user_sessions_prefix}{session.user_id}"
+                pipe.sadd(user_key, session.session_id)
+                pipe.expire(user_key, settings.session_ttl)
+
+            await pipe.execute()
 
         return True
 
@@ -80,66 +247,282 @@ class RedisService:
         content: str,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> bool:
-        """Add a message to a session"""
-        session = await self.get_session(session_id)
-
-        if not session:
-            # Create new session
-            session = ChatSession(session_id=session_id)
-
-        # Add message
+        """Append a message to a session, creating the session if needed"""
         message = ChatMessage(role=role, content=content, metadata=metadata or {})
-        session.messages.append(message)
+        return await self.add_messages(session_id, [message])
+
+    @timed("redis_add_messages")
+    async def add_messages(self, session_id: str, messages: List[ChatMessage]) -> bool:
+        """Append messages to a session in one round trip
+
+        Also refreshes the session TTL, so callers that write don't need a
+        separate ``extend_session_ttl`` call.
+        """
+        if not messages:
+            return False
+
+        meta_key = self._meta_key(session_id)
+        messages_key = self._messages_key(session_id)
+        sources_key = self._sources_key(session_id)
+        now = messages[-1].timestamp.isoformat()
+        encoded, sources = self._encode_messages(messages)
+
+        # Appends are atomic, so concurrent writers never drop each other's messages
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.rpush(messages_key, *encoded)
+            pipe.hset(
+                meta_key, mapping={"session_id": session_id, "last_activity": now}
+            )
+            pipe.hsetnx(meta_key, "created_at", messages[0].timestamp.isoformat())
+            if sources:
+                pipe.hset(sources_key, mapping=sources)
+            for key in (meta_key, messages_key, sources_key):
+                pipe.expire(key, settings.session_ttl)
+            self._track_active(pipe, session_id)
+            length, *_ = await pipe.execute()
+
+        limit = settings.session_history_limit
+        if limit and length > limit:
+            await self._compact(session_id, length - limit)
 
-        # Save session
-        return await self.save_session(session)
+        return True
 
+    async def _compact(self, session_id: str, overflow: int) -> bool:
+        """Remove the oldest ``overflow`` messages and their sources
+
+        With compaction enabled they are folded into the session summary,
+        so the session keeps a record of what was discussed. Only the removed
+        messages are read, so this costs the same however long the session is.
+        """
+        meta_key = self._meta_key(session_id)
+        messages_key = self._messages_key(session_id)
+        sources_key = self._sources_key(session_id)
+
+        async with self.binary_client.pipeline(transaction=True) as pipe:
+            try:
+                # A concurrent append or compaction aborts this one; the next
+                # write compacts again
+                await pipe.watch(messages_key)
+                encoded = await pipe.lrange(messages_key, 0, overflow - 1)
+                records = [self.serializer.loads(m) for m in encoded]
+                refs = [(r.get("metadata") or {}).get("sources_ref") for r in records]
+                refs = [ref for ref in refs if ref]
+
+                summary = None
+                if settings.session_history_compaction:
+                    # The summary keeps the law codes the removed answers cited
+                    sources = await pipe.hmget(sources_key, refs) if refs else []
+                    oldest = self._decode_messages(
+                        encoded,
+                        {
+                            ref.encode(): data
+                            for ref, data in zip(refs, sources)
+                            if data
+                        },
+                    )
+                    summary = await pipe.hget(meta_key, "summary")
+                    summary = self._fold_summary(
+                        json.loads(summary) if summary else None, oldest
+                    )
+
+                pipe.multi()
+                pipe.ltrim(messages_key, len(encoded), -1)
+                if refs:
+                    pipe.hdel(sources_key, *refs)
+                if summary is not None:
+                    pipe.hset(meta_key, "summary", json.dumps(summary, default=str))
+                await pipe.execute()
+                return True
+
+            except redis.WatchError:
+                return False
+
+    @staticmethod
+    def _fold_summary(
+        summary: Optional[Dict[str, Any]], messages: List[ChatMessage]
+    ) -> Dict[str, Any]:
+        """Add compacted messages to a session summary"""
+        summary = summary or {
+            "messages": 0,
+            "first_at": messages[0].timestamp.isoformat() if messages else None,
+            "questions": [],
+            "law_codes": [],
+        }
+        law_codes = set(summary["law_codes"])
+
+        for message in messages:
+            if message.role == MessageRole.USER:
+                summary["questions"].append(message.content[:200])
+            for source in (message.metadata or {}).get("sources", []):
+                law_codes.add(source.get("law_code"))
+
+        summary["messages"] += len(messages)
+        if messages:
+            summary["last_at"] = messages[-1].timestamp.isoformat()
+        # Keep only the most recent questions so the summary stays small
+        summary["questions"] = summary["questions"][-5:]
+        summary["law_codes"] = sorted(code for code in law_codes if code)
+        return summary
+
+    @timed("redis_get_session_messages")
     async def get_session_messages(
-        self, session_id: str, limit: Optional[int] = None
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        include_sources: bool = False,
     ) -> List[ChatMessage]:
-        """Get messages from a session"""
-        session = await self.get_session(session_id)
-
-        if not session:
-            return []
+        """Get the last ``limit`` messages of a session, oldest first
 
-        messages = session.messages
-        if limit:
-            messages = messages[-limit:]
+        Sources cited by answers are only loaded with ``include_sources``.
+        """
+        messages, legacy, *sources = await self._read_messages(
+            session_id, limit, include_sources
+        )
 
-        return messages
+        if legacy:
+            # Read once more after migrating; a blob left behind is ignored
+            await self.migrate_legacy_session(session_id)
+            messages, _, *sources = await self._read_messages(
+                session_id, limit, include_sources
+            )
 
+        return self._decode_messages(messages, sources[0] if sources else None)
+
+    async def _read_messages(
+        self, session_id: str, limit: Optional[int], include_sources: bool
+    ) -> list:
+        """Read a session's last messages and whether an old-format blob exists"""
+        start = -limit if limit else 0
+
+        async with self.binary_client.pipeline(transaction=False) as pipe:
+            pipe.lrange(self._messages_key(session_id), start, -1)
+            pipe.exists(self._legacy_key(session_id))
+            if include_sources:
+                # Bounded by the history limit, since compaction prunes it
+                pipe.hgetall(self._sources_key(session_id))
+            return await pipe.execute()
+
+    @timed("redis_get_session_summary")
+    async def get_session_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get the summary of messages compacted out of a session"""
+        summary = await self.redis_client.hget(self._meta_key(session_id), "summary")
+        return json.loads(summary) if summary else None
+
+    async def migrate_legacy_session(self, session_id: str) -> bool:
+        """Convert a session stored as one JSON blob to the list format
+
+        Messages appended in the new format before the migration ran are
+        kept after the migrated ones. An empty or unreadable blob holds no
+        session, so it is deleted.
+        """
+        legacy_key = self._legacy_key(session_id)
+        meta_key = self._meta_key(session_id)
+        messages_key = self._messages_key(session_id)
+        sources_key = self._sources_key(session_id)
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            try:
+                # Only one caller migrates; others see the blob disappear
+                await pipe.watch(legacy_key)
+                data = await pipe.get(legacy_key)
+                if data is None:
+                    return False
+
+                try:
+                    session = ChatSession(**json.loads(data))
+                except (json.JSONDecodeError, TypeError, ValidationError):
+                    pipe.multi()
+                    pipe.delete(legacy_key)
+                    await pipe.execute()
+                    return False
+
+                ttl = await pipe.ttl(legacy_key)
+                ttl = ttl if ttl and ttl > 0 else settings.session_ttl
+
+                encoded, sources = self._encode_messages(session.messages)
+
+                pipe.multi()
+                if encoded:
+                    # LPUSH reverses its arguments, so push newest first
+                    pipe.lpush(messages_key, *reversed(encoded))
+                if sources:
+                    pipe.hset(sources_key, mapping=sources)
+                for field, value in self._encode_meta(session).items():
+                    pipe.hsetnx(meta_key, field, value)
+                for key in (meta_key, messages_key, sources_key):
+                    pipe.expire(key, ttl)
+                self._track_active(pipe, session_id, ttl)
+                pipe.delete(legacy_key)
+                await pipe.execute()
+                return True
+
+            except redis.WatchError:
+                return False
+
+    async def _session_owners(self, session_ids: List[str]) -> Dict[str, str]:
+        """Map sessions to their user IDs, for sessions that have one"""
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for session_id in session_ids:
+                pipe.hget(self._meta_key(session_id), "user_id")
+                pipe.get(self._legacy_key(session_id))
+            results = await pipe.execute()
+
+        owners = {}
+        for session_id, user_id, legacy in zip(
+            session_ids, results[::2], results[1::2]
+        ):
+            if legacy and not user_id:
+                try:
+                    user_id = json.loads(legacy).get("user_id")
+                except (json.JSONDecodeError, AttributeError):
+                    # An unreadable blob names no owner, but is still deleted
+                    pass
+            if user_id:
+                owners[session_id] = user_id
+        return owners
+
+    @timed("redis_delete_session")
     async def delete_session(self, session_id: str) -> bool:
         """Delete a session"""
-        key = f"{self.session_prefix}{session_id}"
-
         # Get session to check for user_id
-        session = await self.get_session(session_id)
+        owners = await self._session_owners([session_id])
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.delete(*self._session_keys(session_id))
+            pipe.zrem(self.active_sessions_key, session_id)
 
-        # Delete session
-        result = await self.redis_client.delete(key)
+            # Remove from user's session set if applicable
+            if session_id in owners:
+                user_key = f"{self.user_sessions_prefix}{owners[session_id]}"
+                pipe.srem(user_key, session_id)
 
-        # Remove from user's session set if applicable
-        if session and session.user_id:
-            user_key = f"{self.user_sessions_prefix}{session.user_id}"
-            await self.redis_client.srem(user_key, session_id)
+            result, *_ = await pipe.execute()
 
         return result > 0
 
+    @timed("redis_get_user_sessions")
     async def get_user_sessions(self, user_id: str) -> List[str]:
         """Get all session IDs for a user"""
         key = f"{self.user_sessions_prefix}{user_id}"
         session_ids = await self.redis_client.smembers(key)
         return list(session_ids) if session_ids else []
 
-    async def delete_user_sessions(self, user_id: str) -> int:
-        """Delete all sessions for a user"""
+    @timed("redis_delete_user_sessions")
+    async def delete_user_sessions(self, user_id: str, batch_size: int = 500) -> int:
+        """Delete all sessions for a user, one round trip per batch"""
         session_ids = await self.get_user_sessions(user_id)
 
         deleted_count = 0
-        for session_id in session_ids:
-            if await self.delete_session(session_id):
-                deleted_count += 1
+        for start in range(0, len(session_ids), batch_size):
+            batch = session_ids[start : start + batch_size]
+
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for session_id in batch:
+                    pipe.delete(*self._session_keys(session_id))
+                pipe.zrem(self.active_sessions_key, *batch)
+                results = await pipe.execute()
+
+            deleted_count += sum(1 for result in results[:-1] if result > 0)
 
         # Delete user's session set
         user_key = f"{self.user_sessions_prefix}{user_id}"
@@ -147,32 +530,76 @@ class RedisService:
 
         return deleted_count
 
+    @timed("redis_extend_session_ttl")
     async def extend_session_ttl(self, session_id: str) -> bool:
         """Extend the TTL of a session"""
-        key = f"{self.session_prefix}{session_id}"
-        return await self.redis_client.expire(key, settings.session_ttl)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key in self._session_keys(session_id):
+                pipe.expire(key, settings.session_ttl)
+            results = await pipe.execute()
 
-    async def get_active_sessions_count(self) -> int:
-        """Get count of active sessions"""
-        pattern = f"{self.session_prefix}*"
-        cursor = 0
-        count = 0
+        if not any(results):
+            return False
 
-        while True:
-            cursor, keys = await self.redis_client.scan(
-                cursor, match=pattern, count=100
-            )
-            count += len(keys)
-            if cursor == 0:
-                break
+        await self.redis_client.zadd(
+            self.active_sessions_key,
+            {session_id: time.time() + settings.session_ttl},
+        )
+        return True
 
-        return count
+    @timed("redis_get_active_sessions_count")
+    async def get_active_sessions_count(self) -> int:
+        """Get count of active sessions"""
+        # Expired sessions linger in the index until the next session write
+        # prunes them, so count by expiry rather than by size
+        return await self.redis_client.zcount(
+            self.active_sessions_key, time.time(), "+inf"
+        )
 
     async def cleanup_expired_sessions(self) -> int:
-        """Clean up expired sessions (Redis handles this automatically with TTL)"""
-        # This is a placeholder for any additional cleanup logic
-        # Redis automatically removes expired keys
-        return 0
+        """Drop expired sessions from the active-session index
+
+        Session writes already do this; it is only needed after a long
+        period without writes. Redis removes the session keys themselves
+        when their TTL runs out.
+        """
+        return await self.redis_client.zremrangebyscore(
+            self.active_sessions_key, "-inf", time.time()
+        )
+
+    async def rebuild_active_sessions_index(self, batch_size: int = 500) -> int:
+        """Index sessions written before the active-session index existed"""
+        indexed = 0
+        keys = []
+
+        async for key in self.redis_client.scan_iter(
+            match=f"{self.session_prefix}*:meta", count=batch_size
+        ):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                indexed += await self._index_sessions(keys)
+                keys = []
+        if keys:
+            indexed += await self._index_sessions(keys)
+
+        return indexed
+
+    async def _index_sessions(self, meta_keys: List[str]) -> int:
+        """Add sessions to the active-session index using their current TTL"""
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key in meta_keys:
+                pipe.ttl(key)
+            ttls = await pipe.execute()
+
+        now = time.time()
+        entries = {
+            key[len(self.session_prefix) : -len(":meta")]: now + ttl
+            for key, ttl in zip(meta_keys, ttls)
+            if ttl > 0
+        }
+        if entries:
+            await self.redis_client.zadd(self.active_sessions_key, entries)
+        return len(entries)
 
 
 # Create a singleton instance
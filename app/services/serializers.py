@@ -0,0 +1,80 @@
+"""Serializers for session records stored in Redis
+
+Every binary record starts with a format byte, so records written by
+different serializers can coexist and are read back whatever serializer is
+configured. Records without one are plain JSON, as written by earlier
+releases and by ``JsonSerializer``.
+"""
+
+import json
+import zlib
+from typing import Any, Union
+
+import msgpack
+
+FORMAT_MSGPACK = 0x01
+FORMAT_MSGPACK_ZLIB = 0x02
+
+
+class SessionSerializer:
+    """Encodes session records to bytes and decodes any supported format"""
+
+    name = ""
+
+    def dumps(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+    @staticmethod
+    def loads(data: Union[bytes, str]) -> Any:
+        """Decode a record written by any serializer"""
+        if isinstance(data, str):
+            return json.loads(data)
+
+        fmt = data[0] if data else None
+        if fmt == FORMAT_MSGPACK:
+            return msgpack.unpackb(data[1:])
+        if fmt == FORMAT_MSGPACK_ZLIB:
+            return msgpack.unpackb(zlib.decompress(data[1:]))
+        return json.loads(data)
+
+
+class JsonSerializer(SessionSerializer):
+    """Plain JSON, readable by every release"""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+
+class MsgpackSerializer(SessionSerializer):
+    """msgpack, zlib-compressed when the packed record is large
+
+    Compression mainly pays off for source metadata, which repeats law names
+    and content previews.
+    """
+
+    name = "msgpack"
+
+    def __init__(self, compress_min_bytes: int = 1024, level: int = 1):
+        self.compress_min_bytes = compress_min_bytes
+        self.level = level
+
+    def dumps(self, obj: Any) -> bytes:
+        packed = msgpack.packb(obj, default=str)
+
+        if self.compress_min_bytes and len(packed) >= self.compress_min_bytes:
+            compressed = zlib.compress(packed, self.level)
+            if len(compressed) < len(packed):
+                return bytes([FORMAT_MSGPACK_ZLIB]) + compressed
+
+        return bytes([FORMAT_MSGPACK]) + packed
+
+
+def get_serializer(name: str, compress_min_bytes: int = 1024) -> SessionSerializer:
+    """Create a serializer by name"""
+    if name == JsonSerializer.name:
+        return JsonSerializer()
+    if name == MsgpackSerializer.name:
+        return MsgpackSerializer(compress_min_bytes)
+    raise ValueError(f"Unknown session serializer '{name}', expected json or msgpack")
@@ -0,0 +1,84 @@
+"""Migrate chat sessions from the single-blob format to message lists
+
+Older releases stored each session as one JSON string at ``session:{id}``.
+Sessions are now a ``session:{id}:meta`` hash plus a ``session:{id}:messages``
+list. Legacy sessions are also migrated lazily on first read, so running
+this script is optional; it just avoids the one-off cost on live requests.
+
+With ``--rebuild-index`` it also adds sessions written before the
+``sessions:active`` index existed to it, so the active-session count
+includes them.
+"""
+
+import asyncio
+
+from app.services.redis_service import RedisService
+
+
+async def migrate(
+    dry_run: bool = False, batch_size: int = 100, rebuild_index: bool = False
+) -> int:
+    """Migrate every legacy session, returning how many were converted"""
+    service = RedisService()
+    await service.connect()
+
+    migrated = 0
+    try:
+        async for key in service.redis_client.scan_iter(
+            match=f"{service.session_prefix}*", count=batch_size, _type="string"
+        ):
+            session_id = key[len(service.session_prefix) :]
+            if dry_run:
+                print(f"🔎 Would migrate {key}")
+                migrated += 1
+            elif await service.migrate_legacy_session(session_id):
+                migrated += 1
+
+        if rebuild_index and not dry_run:
+            indexed = await service.rebuild_active_sessions_index(batch_size)
+            print(f"📇 Indexed {indexed} active session(s)")
+    finally:
+        await service.disconnect()
+
+    return migrated
+
+
+def main():
+    """Command-line interface for the session migration"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Migrate blob-format chat sessions to append-only lists"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="List legacy sessions without migrating them",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Keys requested per SCAN call (default: 100)",
+    )
+    parser.add_argument(
+        "--rebuild-index",
+        action="store_true",
+        help="Also add existing sessions to the active-session index",
+    )
+
+    args = parser.parse_args()
+
+    migrated = asyncio.run(
+        migrate(
+            dry_run=args.dry_run,
+            batch_size=args.batch_size,
+            rebuild_index=args.rebuild_index,
+        )
+    )
+    action = "Found" if args.dry_run else "Migrated"
+    print(f"✅ {action} {migrated} legacy session(s)")
+
+
+if __name__ == "__main__":
+    main()
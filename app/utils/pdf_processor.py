@@ -5,7 +5,7 @@ populate the Chroma vector database with legal document chunks.
 """
 
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 import chromadb
 from langchain.schema import Document
 
@@ -13,14 +13,22 @@ from app.core.config import settings
 from app.rag.pdf_extractor import PDFExtractor
 from app.rag.law_mapper import LawCodeMapper
 from app.rag.chunking import LegalChunker
+from app.rag.document_store import DocumentEmbeddingStore
+from app.rag.embedding_pool import EmbeddingPool
 from app.rag.embeddings import HuggingFaceEmbedding
 
 
 class PDFProcessor:
     """Process PDF files and populate vector database"""
 
-    def __init__(self, pdf_directory: str = "pdfs"):
+    def __init__(
+        self,
+        pdf_directory: str = "pdfs",
+        embedding_store: Optional[str] = settings.document_embedding_store,
+        workers: int = settings.embedding_workers,
+    ):
         self.pdf_directory = Path(pdf_directory)
+        self.workers = workers
         self.pdf_extractor = PDFExtractor()
         self.law_mapper = LawCodeMapper()
         self.chunker = LegalChunker(
@@ -28,6 +36,13 @@ class PDFProcessor:
         )
         self.embeddings = HuggingFaceEmbedding(settings.embedding_model)
 
+        # Chunks embedded by earlier runs are reused instead of re-encoded
+        self.embedding_store = None
+        if embedding_store:
+            self.embedding_store = DocumentEmbeddingStore(
+                embedding_store, self.embeddings.model_id
+            )
+
         # Initialize Chroma client
         self.chroma_client = chromadb.CloudClient(
             tenant=settings.chroma_tenant_id,
@@ -100,10 +115,35 @@ class PDFProcessor:
         print(f"\n✅ Total documents created: {len(all_documents)}")
         return all_documents
 
+    def embed_texts(
+        self, texts: List[str], pool: Optional[EmbeddingPool] = None
+    ) -> List[List[float]]:
+        """Embed chunk texts, reusing stored embeddings when available"""
+
+        def embed_fn(missing: List[str]) -> List[List[float]]:
+            return self.embeddings.embed_documents(missing, pool=pool)
+
+        if self.embedding_store is not None:
+            return self.embedding_store.embed(texts, embed_fn)
+        return embed_fn(texts)
+
     def populate_vector_store(self, documents: List[Document], recreate: bool = False):
         """Populate Chroma vector store with documents"""
         print(f"\n🔧 Setting up vector store...")
 
+        pool = None
+        if self.workers > 1:
+            pool = EmbeddingPool(
+                self.embeddings.model_name,
+                self.workers,
+                threads=settings.embedding_worker_threads,
+                backend=self.embeddings.backend,
+            )
+            print(
+                f"   🧵 Embedding with {pool.workers} workers, "
+                f"{pool.threads} threads each"
+            )
+
         try:
             if recreate:
                 # Delete existing collection if recreate is True
@@ -125,35 +165,54 @@ class PDFProcessor:
                 )
                 print(f"   ✅ Created new collection: {self.collection_name}")
 
-            # Add documents in batches
+            # Embed large groups, so length bucketing and the worker pool have
+            # plenty of texts to work with, then add documents in batches
             batch_size = 50
+            group_size = 2000
             total_batches = (len(documents) - 1) // batch_size + 1
 
-            for i in range(0, len(documents), batch_size):
-                batch = documents[i : i + batch_size]
-                batch_num = i // batch_size + 1
-                print(f"   📥 Processing batch {batch_num}/{total_batches}")
+            for start in range(0, len(documents), group_size):
+                group = documents[start : start + group_size]
+                print(f"   🧮 Embedding documents {start + 1}-{start + len(group)}")
+                group_embeddings = self.embed_texts(
+                    [doc.page_content for doc in group], pool
+                )
 
-                # Extract texts and metadata
-                texts = [doc.page_content for doc in batch]
-                metadatas = [doc.metadata for doc in batch]
+                for offset in range(0, len(group), batch_size):
+                    i = start + offset
+                    batch = group[offset : offset + batch_size]
+                    batch_num = i // batch_size + 1
+                    print(f"   📥 Processing batch {batch_num}/{total_batches}")
 
-                # Generate embeddings
-                embeddings = self.embeddings.embed_documents(texts)
+                    # Extract texts and metadata
+                    texts = [doc.page_content for doc in batch]
+                    metadatas = [doc.metadata for doc in batch]
+                    embeddings = group_embeddings[offset : offset + batch_size]
 
-                # Generate IDs
-                ids = [f"doc_{i}_{j}" for j in range(len(batch))]
+                    # Generate IDs
+                    ids = [f"doc_{i}_{j}" for j in range(len(batch))]
 
-                # Add to collection
-                collection.add(
-                    documents=texts, embeddings=embeddings, metadatas=metadatas, ids=ids
-                )
+                    # Add to collection
+                    collection.add(
+                        documents=texts,
+                        embeddings=embeddings,
+                        metadatas=metadatas,
+                        ids=ids,
+                    )
 
             print(f"✅ Vector store populated with {len(documents)} documents")
+            if self.embedding_store is not None:
+                print(
+                    f"   ♻️  Reused {self.embedding_store.hits} stored embeddings, "
+                    f"embedded {self.embedding_store.misses} new chunks"
+                )
 
         except Exception as e:
             print(f"❌ Error populating vector store: {str(e)}")
             raise
+        finally:
+            if pool is not None:
+                pool.close()
 
     def run(self, recreate: bool = False):
         """Main method to process PDFs and populate vector store"""
@@ -192,6 +251,17 @@ def main():
         action="store_true",
         help="Recreate the vector database (delete existing data)",
     )
+    parser.add_argument(
+        "--no-embedding-store",
+        action="store_true",
+        help="Embed every chunk instead of reusing stored embeddings",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.embedding_workers,
+        help="Embedding worker processes, each with its own model (0 = in-process)",
+    )
 
     args = parser.parse_args()
 
@@ -205,7 +275,13 @@ def main():
         return
 
     # Run processor
-    processor = PDFProcessor(pdf_directory=args.pdf_dir)
+    processor = PDFProcessor(
+        pdf_directory=args.pdf_dir,
+        embedding_store=(
+            None if args.no_embedding_store else settings.document_embedding_store
+        ),
+        workers=args.workers,
+    )
     processor.run(recreate=args.recreate)
 
 
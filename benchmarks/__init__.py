@@ -0,0 +1 @@
+"""Load and micro-benchmarks run against local stand-ins"""
@@ -0,0 +1,126 @@
+"""Check that clients leaving before the first delta release shared work
+
+Sends identical streaming questions through the coalescer, with a slow
+fake LLM stream holding a generate slot, and lets every client leave before
+the first delta arrives:
+
+- ``started``: the SSE body started and was cancelled while waiting
+- ``unstarted``: the answer stream was closed before the body started
+- ``dropped``: the response was dropped without its body ever running
+
+After each scenario the coalesced flight must be gone, the generate slot
+free and the upstream LLM stream closed. Exits non-zero otherwise.
+
+Usage:
+    python -m benchmarks.disconnects --clients 2
+"""
+
+import argparse
+import asyncio
+import gc
+import sys
+from typing import AsyncGenerator, Callable, Dict, List
+
+from app.api.chat import close_answer_stream, stream_response
+from app.core.admission import AdmissionController, AdmittedStream
+from app.rag.coalescing import StreamCoalescer
+
+
+class NullRedis:
+    """Stands in for RedisService; turns of cancelled answers are dropped"""
+
+    async def add_messages(self, session_id, messages) -> bool:
+        return True
+
+
+async def slow_llm_stream(closed: List[bool]) -> AsyncGenerator[str, None]:
+    """An answer stream whose first delta takes longer than any client waits"""
+    try:
+        while True:
+            await asyncio.sleep(3600)
+            yield "delta"
+    finally:
+        closed.append(True)
+
+
+async def leave_after_start(results: List[Dict]) -> None:
+    """Cancel each SSE body while it waits for the first delta"""
+    bodies = [
+        stream_response("question", f"session-{i}", result, NullRedis())
+        for i, result in enumerate(results)
+    ]
+    tasks = [asyncio.create_task(body.__anext__()) for body in bodies]
+    await asyncio.sleep(0.05)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def leave_before_start(results: List[Dict]) -> None:
+    """Close each answer stream before its SSE body starts"""
+    await close_answer_stream(*[result["answer_stream"] for result in results])
+
+
+async def drop_responses(results: List[Dict]) -> None:
+    """Drop each response without ever running its SSE body"""
+    results.clear()
+    gc.collect()
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "started": leave_after_start,
+    "unstarted": leave_before_start,
+    "dropped": drop_responses,
+}
+
+
+async def run_scenario(leave: Callable, clients: int) -> Dict[str, bool]:
+    """Start ``clients`` identical questions, let them leave, check cleanup"""
+    admission = AdmissionController()
+    admission.enabled = True
+    coalescer = StreamCoalescer()
+    closed: List[bool] = []
+
+    async def start() -> Dict:
+        release = await admission.hold("generate")
+        return {
+            "answer_stream": AdmittedStream(slow_llm_stream(closed), release),
+            "sources": [],
+        }
+
+    results = [await coalescer.run("question", start) for _ in range(clients)]
+    await leave(results)
+
+    # Let the cancelled pipeline and the spawned cleanup tasks finish
+    await asyncio.sleep(0.1)
+
+    return {
+        "flight released": not coalescer._flights,
+        "generate slot released": admission.stages["generate"].in_flight == 0,
+        "upstream closed": bool(closed),
+    }
+
+
+async def run(clients: int) -> bool:
+    passed = True
+    for name, leave in SCENARIOS.items():
+        checks = await run_scenario(leave, clients)
+        for check, ok in checks.items():
+            print(f"{'✅' if ok else '❌'} {name}: {check}")
+            passed = passed and ok
+    return passed
+
+
+def main():
+    """Main function to run the disconnect checks"""
+    parser = argparse.ArgumentParser(description="Check disconnect cleanup")
+    parser.add_argument(
+        "--clients", type=int, default=2, help="Identical questions per scenario"
+    )
+    args = parser.parse_args()
+
+    sys.exit(0 if asyncio.run(run(args.clients)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Parity and speed comparison of the embedding backends on the legal corpus
+
+Embeds a sample of chunks from the PDFs, exactly as ingestion produces them,
+plus the load-test questions with each backend and reports:
+
+- parity: cosine similarity of every chunk vector with the fp32 torch
+  vector, as mean and worst-case drift (1 - cosine), and how many of each
+  question's top-k chunks the backend retrieves in common with torch
+- speed: documents/s embedding the sample in batches of 32, the way
+  ``embed_documents`` does, and p50/p95 latency of single-query encodes
+
+The first backend listed is the reference, so keep ``torch`` first.
+
+Usage:
+    python -m benchmarks.embedding_backends --limit 512 --threads 4
+    python -m benchmarks.embedding_backends --backends torch,onnx-int8 \\
+        --pdf civil_law_code.pdf --output backends.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.rag.chunking import LegalChunker
+from app.rag.embedding_backends import BACKENDS, load_model
+from app.rag.law_mapper import LawCodeMapper
+from app.rag.pdf_extractor import PDFExtractor
+from benchmarks.load_test import QUESTIONS
+
+BATCH_SIZE = 32
+
+
+def load_corpus(pdf_files: List[Path], limit: int, seed: int = 0) -> List[str]:
+    """Chunk the PDFs and sample up to ``limit`` chunks"""
+    chunker = LegalChunker(
+        chunk_size=settings.chunk_size, chunk_overlap=settings.chunk_overlap
+    )
+
+    texts = []
+    for pdf_path in pdf_files:
+        law_code = LawCodeMapper.get_law_info(pdf_path.name)["code"]
+        text = PDFExtractor.extract_text(pdf_path)
+        chunks = chunker.extract_legal_structure(text, law_code)
+        texts.extend(chunk.content for chunk in chunks)
+        print(f"📄 {pdf_path.name}: {len(chunks)} chunks")
+
+    if len(texts) > limit:
+        texts = random.Random(seed).sample(texts, limit)
+    return texts
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def benchmark_backend(
+    backend: str,
+    model_name: str,
+    corpus: List[str],
+    queries: List[str],
+    threads: int,
+    repeat: int,
+) -> Dict:
+    """Load one backend and time it on the corpus and the queries"""
+    started = time.perf_counter()
+    model = load_model(
+        model_name,
+        backend=backend,
+        intra_op_threads=threads,
+        quantization=settings.embedding_quantization,
+        model_dir=settings.embedding_model_dir,
+    )
+    load_s = time.perf_counter() - started
+
+    # Warm up so one-off allocation and graph setup are not timed
+    model.encode(corpus[:BATCH_SIZE], batch_size=BATCH_SIZE)
+
+    started = time.perf_counter()
+    documents = model.encode(corpus, batch_size=BATCH_SIZE, convert_to_tensor=False)
+    embed_s = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            model.encode([query], convert_to_tensor=False)
+            latencies.append(time.perf_counter() - started)
+
+    return {
+        "load_s": round(load_s, 2),
+        "docs_per_s": round(len(corpus) / embed_s, 1),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+        "documents": normalize(documents),
+        "queries": normalize(model.encode(queries, convert_to_tensor=False)),
+    }
+
+
+def parity(result: Dict, reference: Dict, top_k: int) -> Dict[str, float]:
+    """Cosine drift and top-k retrieval agreement against the reference"""
+    cosines = np.sum(result["documents"] * reference["documents"], axis=1)
+    drift = np.maximum(1.0 - cosines, 0.0)
+
+    def top(run: Dict) -> np.ndarray:
+        scores = run["queries"] @ run["documents"].T
+        return np.argsort(-scores, axis=1)[:, :top_k]
+
+    overlap = [
+        len(set(ours) & set(theirs)) / top_k
+        for ours, theirs in zip(top(result), top(reference))
+    ]
+
+    return {
+        "mean_cosine": round(float(cosines.mean()), 6),
+        "mean_drift": round(float(drift.mean()), 8),
+        "p99_drift": round(float(np.percentile(drift, 99)), 8),
+        "max_drift": round(float(drift.max()), 8),
+        f"top{top_k}_overlap": round(float(np.mean(overlap)), 4),
+    }
+
+
+def print_report(results: Dict[str, Dict], top_k: int) -> None:
+    """Print speed and parity per backend, relative to the first one"""
+    header = (
+        f"{'backend':<10} {'docs/s':>8} {'speedup':>8} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'mean drift':>11} {'max drift':>10} {f'top{top_k}':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    baseline = next(iter(results.values()))
+    for backend, result in results.items():
+        print(
+            f"{backend:<10} {result['docs_per_s']:>8.1f} "
+            f"{result['docs_per_s'] / baseline['docs_per_s']:>7.2f}x "
+            f"{result['query_p50_ms']:>8.2f} {result['query_p95_ms']:>8.2f} "
+            f"{result['parity']['mean_drift']:>11.2e} "
+            f"{result['parity']['max_drift']:>10.2e} "
+            f"{result['parity'][f'top{top_k}_overlap']:>7.2%}"
+        )
+
+
+def main():
+    """Main function to run the embedding backend comparison"""
+    parser = argparse.ArgumentParser(description="Compare embedding backends")
+    parser.add_argument(
+        "--backends",
+        default=",".join(BACKENDS),
+        help="Comma-separated backends; the first is the reference",
+    )
+    parser.add_argument("--model", default=settings.embedding_model)
+    parser.add_argument("--pdf-dir", default="pdfs", help="Directory of PDFs")
+    parser.add_argument(
+        "--pdf", action="append", help="Only use this file (repeatable)"
+    )
+    parser.add_argument("--limit", type=int, default=512, help="Chunks to embed")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=settings.embedding_intra_op_threads,
+        help="Intra-op threads per backend (0 = runtime default)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Query latency runs")
+    parser.add_argument("--top-k", type=int, default=10, help="Retrieval depth")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    args = parser.parse_args()
+
+    pdf_files = sorted(Path(args.pdf_dir).glob("*.pdf"))
+    if args.pdf:
+        pdf_files = [path for path in pdf_files if path.name in args.pdf]
+    if not pdf_files:
+        raise SystemExit(f"No PDF files found in {args.pdf_dir}")
+
+    corpus = load_corpus(pdf_files, args.limit)
+    print(f"📚 Embedding {len(corpus)} chunks and {len(QUESTIONS)} questions\n")
+
+    results = {}
+    for backend in args.backends.split(","):
+        print(f"⏱️  {backend}...")
+        results[backend] = benchmark_backend(
+            backend, args.model, corpus, QUESTIONS, args.threads, args.repeat
+        )
+
+    reference = next(iter(results.values()))
+    for result in results.values():
+        result["parity"] = parity(result, reference, args.top_k)
+    for result in results.values():
+        del result["documents"], result["queries"]
+
+    print()
+    print_report(results, args.top_k)
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "model": args.model,
+                "chunks": len(corpus),
+                "threads": args.threads,
+                "quantization": settings.embedding_quantization,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Fake OpenAI-compatible chat completions server for load tests
+
+Streams a fixed answer after a configurable time to first token and at a
+configurable token rate, so the API can be benchmarked without spending
+OpenAI quota.
+
+Usage:
+    python -m benchmarks.fake_openai --ttft-ms 400 --tokens-per-second 60
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = ["Azərbaycan ", "qanunvericiliyinə ", "əsasən, ", "Maddə ", "12 ", "tətbiq "]
+
+
+def create_app(ttft_ms: float, tokens_per_second: float, tokens: int) -> FastAPI:
+    """Build the fake server with the given latency profile"""
+    app = FastAPI(title="Fake OpenAI")
+    interval = 1 / tokens_per_second if tokens_per_second > 0 else 0.0
+
+    def chunk(completion_id: str, model: str, delta: dict, finish_reason=None):
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    async def stream(completion_id: str, model: str, max_tokens: int):
+        await asyncio.sleep(ttft_ms / 1000)
+        yield chunk(completion_id, model, {"role": "assistant", "content": ""})
+
+        # Sleep against a schedule so the rate holds under event loop load
+        started = time.perf_counter()
+        for i in range(max_tokens):
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield chunk(completion_id, model, {"content": WORDS[i % len(WORDS)]})
+
+        yield chunk(completion_id, model, {}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+        max_tokens = min(body.get("max_tokens") or tokens, tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        if body.get("stream"):
+            return StreamingResponse(
+                stream(completion_id, model, max_tokens),
+                media_type="text/event-stream",
+            )
+
+        await asyncio.sleep(ttft_ms / 1000 + max_tokens * interval)
+        content = "".join(WORDS[i % len(WORDS)] for i in range(max_tokens))
+        return JSONResponse(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 0,
+                    "completion_tokens": max_tokens,
+                    "total_tokens": max_tokens,
+                },
+            }
+        )
+
+    return app
+
+
+def main():
+    """Main function to run the fake OpenAI server"""
+    parser = argparse.ArgumentParser(description="Fake OpenAI streaming server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--ttft-ms", type=float, default=400)
+    parser.add_argument("--tokens-per-second", type=float, default=60)
+    parser.add_argument("--tokens", type=int, default=200, help="Tokens per answer")
+
+    args = parser.parse_args()
+
+    app = create_app(args.ttft_ms, args.tokens_per_second, args.tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
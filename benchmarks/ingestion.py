@@ -0,0 +1,222 @@
+"""Micro-benchmarks for the PDF ingestion hot paths
+
+Times PDFExtractor.extract_text, TextNormalizer.normalize_text and
+LegalChunker.extract_legal_structure for each PDF and reports pages/s,
+chars/s, chunks/s and peak memory. Timings are the median of ``--repeat``
+runs; peak memory comes from one extra run under tracemalloc so its
+overhead does not distort the timings.
+
+Usage:
+    python -m benchmarks.ingestion --repeat 3 --output ingestion.json
+    python -m benchmarks.ingestion --compare ingestion.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import PyPDF2
+
+from app.core.config import settings
+from app.rag.chunking import LegalChunker
+from app.rag.law_mapper import LawCodeMapper
+from app.rag.pdf_extractor import PDFExtractor
+from app.rag.text_processing import TextNormalizer
+
+STAGES = ("extract", "normalize", "chunk")
+
+
+def count_pages(pdf_path: Path) -> int:
+    """Number of pages in a PDF"""
+    with open(pdf_path, "rb") as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Tuple[Any, float, float]:
+    """Return the result, median seconds and peak traced MiB of a call"""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, statistics.median(durations), peak / (1024 * 1024)
+
+
+def rate(amount: float, seconds: float) -> float:
+    return round(amount / seconds, 1) if seconds else 0.0
+
+
+def benchmark_pdf(pdf_path: Path, chunker: LegalChunker, repeat: int) -> Dict:
+    """Benchmark every ingestion stage on one PDF"""
+    law_code = LawCodeMapper.get_law_info(pdf_path.name)["code"]
+    pages = count_pages(pdf_path)
+
+    text, extract_s, extract_mb = measure(
+        lambda: PDFExtractor.extract_text(pdf_path), repeat
+    )
+    chars = len(text)
+
+    _, normalize_s, normalize_mb = measure(
+        lambda: TextNormalizer.normalize_text(text), repeat
+    )
+    chunks, chunk_s, chunk_mb = measure(
+        lambda: chunker.extract_legal_structure(text, law_code), repeat
+    )
+
+    return {
+        "pages": pages,
+        "chars": chars,
+        "chunks": len(chunks),
+        "stages": {
+            "extract": {
+                "seconds": round(extract_s, 4),
+                "pages_per_s": rate(pages, extract_s),
+                "chars_per_s": rate(chars, extract_s),
+                "peak_mb": round(extract_mb, 1),
+            },
+            "normalize": {
+                "seconds": round(normalize_s, 4),
+                "chars_per_s": rate(chars, normalize_s),
+                "peak_mb": round(normalize_mb, 1),
+            },
+            "chunk": {
+                "seconds": round(chunk_s, 4),
+                "chars_per_s": rate(chars, chunk_s),
+                "chunks_per_s": rate(len(chunks), chunk_s),
+                "peak_mb": round(chunk_mb, 1),
+            },
+        },
+    }
+
+
+def summarize(pdfs: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Totals over all PDFs per stage"""
+    pages = sum(result["pages"] for result in pdfs.values())
+    chars = sum(result["chars"] for result in pdfs.values())
+    chunks = sum(result["chunks"] for result in pdfs.values())
+
+    totals = {}
+    for stage in STAGES:
+        seconds = sum(result["stages"][stage]["seconds"] for result in pdfs.values())
+        totals[stage] = {
+            "seconds": round(seconds, 4),
+            "pages_per_s": rate(pages, seconds),
+            "chars_per_s": rate(chars, seconds),
+            "chunks_per_s": rate(chunks, seconds),
+            "peak_mb": max(
+                (result["stages"][stage]["peak_mb"] for result in pdfs.values()),
+                default=0.0,
+            ),
+        }
+    return {"pages": pages, "chars": chars, "chunks": chunks, "stages": totals}
+
+
+def print_report(report: Dict, baseline: Optional[Dict] = None) -> None:
+    """Print per-PDF stage timings, with speedups against a baseline"""
+    header = (
+        f"{'pdf':<45} {'pages':>6} {'chunks':>7} "
+        f"{'extract s':>10} {'normalize s':>12} {'chunk s':>9} {'peak MiB':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    rows = list(report["pdfs"].items()) + [("TOTAL", report["totals"])]
+    for name, result in rows:
+        stages = result["stages"]
+        peak = max(stages[stage]["peak_mb"] for stage in STAGES)
+        print(
+            f"{name:<45} {result['pages']:>6} {result['chunks']:>7} "
+            f"{stages['extract']['seconds']:>10.3f} "
+            f"{stages['normalize']['seconds']:>12.3f} "
+            f"{stages['chunk']['seconds']:>9.3f} {peak:>9.1f}"
+        )
+
+    if baseline is None:
+        return
+
+    print("\nSpeedup vs baseline (baseline seconds / current seconds):")
+    for stage in STAGES:
+        before = baseline["totals"]["stages"][stage]["seconds"]
+        after = report["totals"]["stages"][stage]["seconds"]
+        speedup = before / after if after else float("inf")
+        print(f"   {stage:<10} {before:>9.3f}s -> {after:>9.3f}s  x{speedup:.2f}")
+
+    if baseline["totals"]["chunks"] != report["totals"]["chunks"]:
+        print(
+            f"   ⚠️  Chunk count changed: {baseline['totals']['chunks']} -> "
+            f"{report['totals']['chunks']}"
+        )
+
+
+def main():
+    """Main function to run the ingestion benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmark PDF ingestion stages")
+    parser.add_argument("--pdf-dir", default="pdfs", help="Directory of PDFs")
+    parser.add_argument(
+        "--pdf", action="append", help="Only benchmark this file (repeatable)"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+
+    args = parser.parse_args()
+
+    pdf_dir = Path(args.pdf_dir)
+    pdf_files: List[Path] = sorted(pdf_dir.glob("*.pdf"))
+    if args.pdf:
+        pdf_files = [path for path in pdf_files if path.name in args.pdf]
+    if not pdf_files:
+        raise SystemExit(f"No PDF files found in {pdf_dir}")
+
+    chunker = LegalChunker(
+        chunk_size=settings.chunk_size, chunk_overlap=settings.chunk_overlap
+    )
+
+    pdfs = {}
+    for pdf_path in pdf_files:
+        print(f"📄 {pdf_path.name}...")
+        pdfs[pdf_path.name] = benchmark_pdf(pdf_path, chunker, args.repeat)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "chunk_size": settings.chunk_size,
+            "chunk_overlap": settings.chunk_overlap,
+        },
+        "pdfs": pdfs,
+        "totals": summarize(pdfs),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print()
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, sort_keys=True)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
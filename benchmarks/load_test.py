@@ -0,0 +1,202 @@
+"""Load generator for the streaming chat endpoint
+
+Runs a fixed number of streaming chat requests at each concurrency level
+and reports requests per second plus p50/p95/p99 time to first token and
+stream completion time.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 1,8,32,64 --requests 200
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+QUESTIONS = [
+    "Miras hüququ haqqında məlumat verin",
+    "Evliliyin qeydiyyatı üçün hansı sənədlər lazımdır?",
+    "Əmək müqaviləsi necə ləğv edilir?",
+    "Oğurluğa görə hansı cəza nəzərdə tutulub?",
+    "Mülkiyyət hüququ necə qorunur?",
+]
+
+
+def parse_event(line: str) -> Optional[Dict[str, Any]]:
+    """Parse an SSE line into a stream chunk, unwrapping nested data prefixes"""
+    payload = line
+    while payload.startswith("data:"):
+        payload = payload[len("data:") :].strip()
+    if not payload.startswith("{"):
+        return None
+    return json.loads(payload)
+
+
+async def stream_chat(
+    client: httpx.AsyncClient, question: str, session_id: str
+) -> Dict[str, Any]:
+    """Send one streaming chat request and time it"""
+    started = time.perf_counter()
+    result = {"status": None, "ttft": None, "total": None, "error": None}
+
+    try:
+        async with client.stream(
+            "POST",
+            "/api/v1/chat/stream",
+            json={"message": question, "session_id": session_id},
+        ) as response:
+            result["status"] = response.status_code
+            if response.status_code != 200:
+                await response.aread()
+                return result
+
+            async for line in response.aiter_lines():
+                chunk = parse_event(line)
+                if chunk is None:
+                    continue
+                if chunk["type"] == "content" and result["ttft"] is None:
+                    result["ttft"] = time.perf_counter() - started
+                elif chunk["type"] == "error":
+                    result["error"] = chunk.get("error")
+                elif chunk["type"] == "done":
+                    break
+
+        result["total"] = time.perf_counter() - started
+
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+
+    return result
+
+
+async def run_level(
+    client: httpx.AsyncClient, concurrency: int, requests: int, repeat: bool
+) -> List[Dict[str, Any]]:
+    """Run ``requests`` streaming requests with ``concurrency`` in flight"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        if not repeat:
+            # Unique questions keep the answer caches out of the measurement
+            question = f"{question} ({uuid.uuid4().hex[:8]})"
+        queue.put_nowait(question)
+
+    results = []
+
+    async def worker():
+        while not queue.empty():
+            question = queue.get_nowait()
+            results.append(
+                await stream_chat(client, question, f"bench-{uuid.uuid4().hex}")
+            )
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return results
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99 in milliseconds"""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return {"p50": round(p50, 1), "p95": round(p95, 1), "p99": round(p99, 1)}
+
+
+def summarize(
+    concurrency: int, results: List[Dict[str, Any]], elapsed: float
+) -> Dict[str, Any]:
+    """Aggregate one concurrency level"""
+    ok = [r for r in results if r["status"] == 200 and r["error"] is None]
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "ok": len(ok),
+        "rejected": sum(1 for r in results if r["status"] == 429),
+        "errors": len(results) - len(ok),
+        "rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "ttft_ms": percentiles([r["ttft"] for r in ok if r["ttft"] is not None]),
+        "completion_ms": percentiles([r["total"] for r in ok]),
+    }
+
+
+def print_report(levels: List[Dict[str, Any]]) -> None:
+    """Print a table with one row per concurrency level"""
+    header = (
+        f"{'conc':>5} {'ok':>6} {'429':>5} {'err':>5} {'rps':>8} "
+        f"{'ttft p50':>9} {'p95':>8} {'p99':>8} "
+        f"{'done p50':>9} {'p95':>8} {'p99':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    def ms(value):
+        return f"{value:.0f}" if value is not None else "-"
+
+    for level in levels:
+        ttft, done = level["ttft_ms"], level["completion_ms"]
+        print(
+            f"{level['concurrency']:>5} {level['ok']:>6} {level['rejected']:>5} "
+            f"{level['errors']:>5} {level['rps']:>8.2f} "
+            f"{ms(ttft['p50']):>9} {ms(ttft['p95']):>8} {ms(ttft['p99']):>8} "
+            f"{ms(done['p50']):>9} {ms(done['p95']):>8} {ms(done['p99']):>8}"
+        )
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    levels = []
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 8)
+    async with httpx.AsyncClient(
+        base_url=args.url, timeout=args.timeout, limits=limits
+    ) as client:
+        if args.warmup:
+            await run_level(client, min(args.concurrency), args.warmup, args.repeat)
+
+        for concurrency in args.concurrency:
+            started = time.perf_counter()
+            results = await run_level(client, concurrency, args.requests, args.repeat)
+            levels.append(
+                summarize(concurrency, results, time.perf_counter() - started)
+            )
+            print(f"✅ Concurrency {concurrency} done")
+
+    return levels
+
+
+def main():
+    """Main function to run the load test"""
+    parser = argparse.ArgumentParser(description="Load test /api/v1/chat/stream")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(c) for c in value.split(",")],
+        default=[1, 8, 32],
+        help="Comma-separated concurrency levels",
+    )
+    parser.add_argument("--requests", type=int, default=100, help="Per level")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument(
+        "--repeat",
+        action="store_true",
+        help="Reuse a small question set so answer caches are exercised",
+    )
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    args = parser.parse_args()
+
+    levels = asyncio.run(run(args))
+    print_report(levels)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "levels": levels}, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
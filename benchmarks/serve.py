@@ -0,0 +1,69 @@
+"""Run the API against local stand-ins for OpenAI, Chroma and the model
+
+The RAG service is built with an in-memory collection and, unless
+``--real-embeddings`` is given, hash-based embeddings. LLM calls go to the
+fake OpenAI server. Sessions still use the Redis at ``REDIS_URL``.
+
+Usage:
+    python -m benchmarks.fake_openai &
+    python -m benchmarks.serve --chroma-latency-ms 60
+"""
+
+import argparse
+import os
+
+
+def main():
+    """Main function to serve the API with stand-ins"""
+    parser = argparse.ArgumentParser(description="Serve the API with stand-ins")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--openai-url", default="http://127.0.0.1:8001/v1")
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--chroma-latency-ms", type=float, default=0.0)
+    parser.add_argument("--encode-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--real-embeddings",
+        action="store_true",
+        help="Load EMBEDDING_MODEL instead of hash-based embeddings",
+    )
+
+    args = parser.parse_args()
+
+    # Settings are read on import, so configure the environment first
+    os.environ["OPENAI_BASE_URL"] = args.openai_url
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("CHROMA_API_KEY", "benchmark")
+
+    import uvicorn
+
+    import app.rag.service as rag_service
+    from app.main import app
+    from benchmarks.stand_ins import (
+        HashingEmbedding,
+        InMemoryChromaClient,
+        InMemoryCollection,
+    )
+
+    embeddings = None
+    if not args.real_embeddings:
+        embeddings = HashingEmbedding(args.dim, args.encode_ms)
+
+    # --dim must match the model's dimension when using real embeddings
+    collection = InMemoryCollection(
+        num_documents=args.documents,
+        dim=args.dim,
+        latency_ms=args.chroma_latency_ms,
+    )
+
+    # Install the service before startup so the lifespan warms it up
+    rag_service._rag_instance = rag_service.AzerbaijanLegalRAG(
+        chroma_client=InMemoryChromaClient(collection), embeddings=embeddings
+    )
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
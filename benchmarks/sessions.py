@@ -0,0 +1,200 @@
+"""Micro-benchmark for session record encoding
+
+Encodes and decodes synthetic chat turns (a question plus an answer citing
+several sources) and reports stored bytes and CPU time per turn for:
+
+- ``json+pydantic``: ``json.dumps(model_dump(mode="json"))`` with pydantic
+  validation on read, as sessions were stored before the serializers
+- each configured serializer with the unvalidated read path RedisService
+  uses, with sources stored separately as they are in Redis
+
+Usage:
+    python -m benchmarks.sessions --turns 200 --output sessions.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from app.models.chat import ChatMessage, MessageRole, SourceReference
+from app.services.redis_service import RedisService
+from app.services.serializers import JsonSerializer, MsgpackSerializer
+
+LAWS = [
+    ("civil", "Mülki Məcəllə", "Civil Code"),
+    ("family", "Ailə Məcəlləsi", "Family Code"),
+    ("labor", "Əmək Məcəlləsi", "Labor Code"),
+    ("tax", "Vergi Məcəlləsi", "Tax Code"),
+    ("criminal", "Cinayət Məcəlləsi", "Criminal Code"),
+]
+
+WORDS = (
+    "vərəsəlik miras qoyanın ölümü ilə və ya onun ölmüş elan edilməsi "
+    "açılır mirasın açılması günü öldüyü gündür məhkəmə qərarı mülkiyyət "
+    "hüququ müqavilə öhdəlik tərəflər əmlak qanunvericilik maddə bənd"
+).split()
+
+
+def text(rng: random.Random, chars: int) -> str:
+    """Pseudo-random Azerbaijani text, so compression ratios are realistic"""
+    words = []
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)[:chars]
+
+
+def build_turn(index: int, sources: int) -> List[ChatMessage]:
+    """A question and an answer citing ``sources`` articles"""
+    rng = random.Random(index)
+
+    references = []
+    for i in range(sources):
+        code, name_az, name_en = LAWS[i % len(LAWS)]
+        references.append(
+            SourceReference(
+                law_code=code,
+                law_name_az=name_az,
+                law_name_en=name_en,
+                article_reference=f"Maddə {index + i}",
+                relevance_score=0.9 - i * 0.05,
+                content_preview=text(rng, 500),
+            )
+        )
+
+    return [
+        ChatMessage(
+            role=MessageRole.USER,
+            content=text(rng, 80) + "?",
+            metadata={},
+        ),
+        ChatMessage(
+            role=MessageRole.ASSISTANT,
+            content=text(rng, 1500),
+            metadata={
+                "sources": [r.model_dump() for r in references],
+                "processing_time": 1.234,
+                "status": "completed",
+            },
+        ),
+    ]
+
+
+def timed_runs(func: Callable[[], object], repeat: int) -> float:
+    """Median seconds of ``repeat`` calls"""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def bench_pydantic(messages: List[ChatMessage], repeat: int) -> Dict[str, float]:
+    """Sessions as stored before the pluggable serializers"""
+
+    def encode():
+        return [json.dumps(m.model_dump(mode="json"), default=str) for m in messages]
+
+    def decode():
+        return [ChatMessage(**json.loads(m)) for m in encoded]
+
+    encoded = encode()
+
+    return {
+        "bytes": sum(len(m.encode("utf-8")) for m in encoded),
+        "encode_s": timed_runs(encode, repeat),
+        "decode_s": timed_runs(decode, repeat),
+        # Sources are inline, so reading them costs nothing extra
+        "decode_with_sources_s": timed_runs(decode, repeat),
+    }
+
+
+def bench_serializer(
+    service: RedisService, messages: List[ChatMessage], repeat: int
+) -> Dict[str, float]:
+    """Messages and sources as RedisService stores them"""
+    encoded, sources = service._encode_messages(messages)
+    keyed = {ref.encode(): data for ref, data in sources.items()}
+
+    return {
+        "bytes": sum(map(len, encoded)) + sum(map(len, sources.values())),
+        "encode_s": timed_runs(lambda: service._encode_messages(messages), repeat),
+        "decode_s": timed_runs(lambda: service._decode_messages(encoded), repeat),
+        "decode_with_sources_s": timed_runs(
+            lambda: service._decode_messages(encoded, keyed), repeat
+        ),
+    }
+
+
+def print_report(results: Dict[str, Dict[str, float]], turns: int) -> None:
+    """Print per-turn size and timings, relative to the first row"""
+    header = (
+        f"{'format':<18} {'bytes/turn':>11} {'encode µs':>10} "
+        f"{'decode µs':>10} {'+sources µs':>12} {'size':>7} {'cpu':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    baseline = next(iter(results.values()))
+    base_cpu = baseline["encode_s"] + baseline["decode_s"]
+    for name, result in results.items():
+        cpu = result["encode_s"] + result["decode_s"]
+        print(
+            f"{name:<18} {result['bytes'] / turns:>11.0f} "
+            f"{result['encode_s'] / turns * 1e6:>10.1f} "
+            f"{result['decode_s'] / turns * 1e6:>10.1f} "
+            f"{result['decode_with_sources_s'] / turns * 1e6:>12.1f} "
+            f"{result['bytes'] / baseline['bytes']:>6.2f}x "
+            f"{cpu / base_cpu:>6.2f}x"
+        )
+
+
+def main():
+    """Main function to run the session encoding benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark session encoding")
+    parser.add_argument("--turns", type=int, default=200, help="Turns to encode")
+    parser.add_argument("--sources", type=int, default=5, help="Sources per answer")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    args = parser.parse_args()
+
+    messages = []
+    for i in range(args.turns):
+        messages.extend(build_turn(i, args.sources))
+
+    results = {"json+pydantic": bench_pydantic(messages, args.repeat)}
+    serializers = {
+        "json": JsonSerializer(),
+        "msgpack": MsgpackSerializer(compress_min_bytes=0),
+        "msgpack+zlib": MsgpackSerializer(),
+    }
+    for name, serializer in serializers.items():
+        service = RedisService(serializer=serializer)
+        results[name] = bench_serializer(service, messages, args.repeat)
+
+    print_report(results, args.turns)
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "turns": args.turns,
+                "sources": args.sources,
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""In-process stand-ins for Chroma Cloud and the embedding model"""
+
+import hashlib
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.rag.embeddings import HuggingFaceEmbedding
+from app.rag.law_mapper import LawCodeMapper
+
+
+class HashingModel:
+    """Deterministic pseudo-embeddings derived from a hash of each text
+
+    Stands in for SentenceTransformer so the API can be load-tested without
+    loading the real model. ``encode_ms`` simulates the per-batch model cost.
+    """
+
+    def __init__(self, dim: int = 1024, encode_ms: float = 0.0):
+        self.dim = dim
+        self.encode_ms = encode_ms
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        if self.encode_ms:
+            time.sleep(self.encode_ms / 1000)
+
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+            vectors[i] = np.random.default_rng(seed).standard_normal(self.dim)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class HashingEmbedding(HuggingFaceEmbedding):
+    """HuggingFaceEmbedding backed by a HashingModel"""
+
+    def __init__(self, dim: int = 1024, encode_ms: float = 0.0):
+        self.dim = dim
+        self.encode_ms = encode_ms
+        super().__init__(f"hashing-{dim}")
+
+    def _load_model(self) -> HashingModel:
+        return HashingModel(self.dim, self.encode_ms)
+
+
+class InMemoryCollection:
+    """Chroma collection stand-in implementing the ``query`` contract
+
+    Holds synthetic legal chunks with the metadata written by the PDF
+    processor and answers nearest-neighbour queries by cosine distance.
+    ``latency_ms`` simulates the Chroma Cloud round trip.
+    """
+
+    def __init__(
+        self,
+        num_documents: int = 5000,
+        dim: int = 1024,
+        latency_ms: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        rng = np.random.default_rng(seed)
+        vectors = rng.standard_normal((num_documents, dim)).astype(np.float32)
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        laws = list(LawCodeMapper.LAW_CODES.values())
+        self.ids = [f"chunk_{i}" for i in range(num_documents)]
+        self.documents = []
+        self.metadatas = []
+        for i in range(num_documents):
+            law = laws[i % len(laws)]
+            article = i // len(laws) + 1
+            self.documents.append(
+                f"Maddə {article}. {law['name_az']} üzrə sınaq mətni. " * 12
+            )
+            self.metadatas.append(
+                {
+                    "law_code": law["code"],
+                    "law_name_az": law["name_az"],
+                    "law_name_en": law["name_en"],
+                    "chunk_type": "article",
+                    "article_number": str(article),
+                    "article_reference": f"Maddə {article}",
+                }
+            )
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def _matches(self, where: Optional[Dict[str, Any]], metadata: Dict) -> bool:
+        """Evaluate the subset of the where syntax used by the retriever"""
+        if not where:
+            return True
+        if "$and" in where:
+            return all(self._matches(clause, metadata) for clause in where["$and"])
+
+        ((field, condition),) = where.items()
+        if isinstance(condition, dict):
+            return metadata.get(field) in condition["$in"]
+        return metadata.get(field) == condition
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        include: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> Dict[str, List[List[Any]]]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        candidates = np.array(
+            [i for i, m in enumerate(self.metadatas) if self._matches(where, m)],
+            dtype=np.int64,
+        )
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        for query in queries:
+            if not len(candidates):
+                top = candidates
+                distances = np.empty(0, dtype=np.float32)
+            else:
+                scores = self.vectors[candidates] @ query
+                n = min(n_results, len(candidates))
+                best = np.argpartition(-scores, n - 1)[:n]
+                best = best[np.argsort(-scores[best])]
+                top = candidates[best]
+                distances = 1 - scores[best]
+
+            results["ids"].append([self.ids[i] for i in top])
+            results["documents"].append([self.documents[i] for i in top])
+            # Copies, since callers add scores to the metadata in place
+            results["metadatas"].append([dict(self.metadatas[i]) for i in top])
+            results["distances"].append([float(d) for d in distances])
+
+        return results
+
+
+class InMemoryChromaClient:
+    """Chroma client stand-in serving a single in-memory collection"""
+
+    def __init__(self, collection: InMemoryCollection):
+        self.collection = collection
+
+    def get_collection(self, name: str) -> InMemoryCollection:
+        return self.collection
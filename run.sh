@@ -15,12 +15,36 @@ echo "Starting Azerbaijan Legal RAG API..."
 echo "Workers: $WORKERS"
 echo "Host: $HOST:$PORT"
 
+# Workers write metrics here so /metrics reports all of them; clear
+# samples left by a previous run
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus_multiproc}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Optionally load the embedding model once and share it between workers
+if [ -n "$EMBEDDING_SERVER_SOCKET" ]; then
+    echo "Starting shared embedding server on $EMBEDDING_SERVER_SOCKET..."
+    rm -f "$EMBEDDING_SERVER_SOCKET"
+    python -m app.rag.embedding_server --socket "$EMBEDDING_SERVER_SOCKET" &
+
+    # The socket appears once the model is loaded
+    for _ in $(seq 1 ${EMBEDDING_SERVER_START_TIMEOUT:-300}); do
+        [ -S "$EMBEDDING_SERVER_SOCKET" ] && break
+        sleep 1
+    done
+    if [ ! -S "$EMBEDDING_SERVER_SOCKET" ]; then
+        echo "Embedding server did not start"
+        exit 1
+    fi
+fi
+
 # For production with multiple workers, use gunicorn with uvicorn workers
 if [ "$WORKERS" -gt 1 ]; then
     echo "Running with gunicorn (multiple workers)..."
     exec gunicorn app.main:app \
         --workers $WORKERS \
         --worker-class uvicorn.workers.UvicornWorker \
+        --config python:app.gunicorn_conf \
         --bind $HOST:$PORT \
         --access-logfile - \
         --error-logfile - \